@@ -1,76 +1,990 @@
+import csv
 import json
 import datetime
-from collections import defaultdict
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+
+from append_log import AppendLog
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+@lru_cache(maxsize=4096)
+def day_number(date):
+    """Day number (date ordinal) of a YYYY-MM-DD string."""
+    return datetime.date.fromisoformat(date).toordinal()
+
+@lru_cache(maxsize=4096)
+def day_string(day):
+    """YYYY-MM-DD string of a day number."""
+    return datetime.date.fromordinal(day).isoformat()
+
+def to_cents(amount):
+    """Dollar amount as integer cents."""
+    return round(float(amount) * 100)
+
+def expenses_to_columns(expenses):
+    """Expense dicts as snapshot columns (day numbers, cents, coded categories)."""
+    category_codes = {}
+    columns = {'days': [], 'cents': [], 'categories': [], 'codes': [], 'descriptions': []}
+    for expense in expenses:
+        code = category_codes.get(expense['category'])
+        if code is None:
+            code = category_codes[expense['category']] = len(columns['categories'])
+            columns['categories'].append(expense['category'])
+        columns['days'].append(day_number(expense['date']))
+        columns['cents'].append(to_cents(expense['amount']))
+        columns['codes'].append(code)
+        columns['descriptions'].append(expense['description'])
+    return columns
+
+def columns_to_expenses(columns):
+    """Snapshot columns back as expense dicts."""
+    categories = columns['categories']
+    return [{"date": day_string(day), "amount": cents / 100,
+             "category": categories[code], "description": description}
+            for day, cents, code, description in zip(columns['days'], columns['cents'],
+                                                     columns['codes'], columns['descriptions'])]
+
+
+class Rollups:
+    """Running totals in cents per category, day, month and category x month."""
+    def __init__(self):
+        self.by_category = Counter()
+        self.by_day = Counter()
+        self.by_month = Counter()
+        self.by_category_month = defaultdict(Counter)
+    
+    def add(self, expenses):
+        """Fold new expense dicts into the totals."""
+        for expense in expenses:
+            cents = to_cents(expense['amount'])
+            month = expense['date'][:7]
+            self.by_category[expense['category']] += cents
+            self.by_day[expense['date']] += cents
+            self.by_month[month] += cents
+            self.by_category_month[expense['category']][month] += cents
+    
+    def to_dict(self):
+        """The totals as JSON-ready dicts."""
+        return {
+            'by_category': dict(self.by_category),
+            'by_day': dict(self.by_day),
+            'by_month': dict(self.by_month),
+            'by_category_month': {category: dict(months)
+                                  for category, months in self.by_category_month.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Totals saved by to_dict()."""
+        rollups = cls()
+        rollups.by_category.update(data['by_category'])
+        rollups.by_day.update(data['by_day'])
+        rollups.by_month.update(data['by_month'])
+        for category, months in data['by_category_month'].items():
+            rollups.by_category_month[category].update(months)
+        return rollups
+    
+    def differences(self, other):
+        """Descriptions of every group whose total differs from other's."""
+        problems = []
+        for name in ('by_category', 'by_day', 'by_month'):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            for key in sorted(mine.keys() | theirs.keys()):
+                if key not in mine or key not in theirs or mine[key] != theirs[key]:
+                    problems.append(f"{name}[{key}]: {mine.get(key)} != {theirs.get(key)} cents")
+        for category in sorted(self.by_category_month.keys() | other.by_category_month.keys()):
+            mine, theirs = self.by_category_month.get(category, {}), other.by_category_month.get(category, {})
+            for month in sorted(mine.keys() | theirs.keys()):
+                if month not in mine or month not in theirs or mine[month] != theirs[month]:
+                    problems.append(f"by_category_month[{category}][{month}]: "
+                                    f"{mine.get(month)} != {theirs.get(month)} cents")
+        return problems
+
+
+class ExpenseJournal(AppendLog):
+    """Append-only NDJSON journal of new expenses on top of a columnar snapshot.
+    
+    Each append is one line (an expense, or a list of them for a batch),
+    written and fsynced at once, and compaction folds the journal into a
+    fresh snapshot. Compaction counts expenses, not lines.
+    """
+    def __init__(self, filename="expenses", compact_every=100000):
+        super().__init__(filename, compact_every, log_suffix=".ndjson")
+    
+    def load(self):
+        """Load the snapshot and the journal tail; returns (snapshot or None, tail expenses)."""
+        snapshot = self.read_snapshot()
+        tail = []
+        for record in self.read_log():
+            if isinstance(record, list):
+                tail.extend(record)
+            else:
+                tail.append(record)
+        self.log_records = len(tail)
+        return snapshot, tail
+    
+    def append(self, expenses):
+        """Durably append expenses with a single write and fsync."""
+        self.append_records([expenses if len(expenses) > 1 else expenses[0]], count=len(expenses))
+    
+    def compact(self, snapshot):
+        """Write a fresh snapshot and truncate the journal."""
+        self.write_snapshot(snapshot)
+
+
+class ColumnarLedger:
+    """Expenses as NumPy columns: int32 day numbers, integer cents and category codes.
+    
+    Categories are dictionary-encoded: codes index into self.categories.
+    Descriptions stay in a plain list since nothing aggregates them.
+    """
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.days = np.empty(capacity, dtype=np.int32)
+        self.cents = np.empty(capacity, dtype=np.int64)
+        self.codes = np.empty(capacity, dtype=np.int32)
+        self.descriptions = []
+        self.categories = []
+        self.category_codes = {}
+    
+    def __len__(self):
+        return self.size
+    
+    def category_code(self, category):
+        """Code for a category name, assigning the next one if it is new."""
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+    
+    def reserve(self, extra):
+        """Grow the columns (doubling) so extra more rows fit."""
+        needed = self.size + extra
+        capacity = len(self.days)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('days', 'cents', 'codes'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+    
+    def extend(self, expenses):
+        """Append expense dicts in one batch."""
+        expenses = list(expenses)
+        self.reserve(len(expenses))
+        end = self.size + len(expenses)
+        self.days[self.size:end] = [day_number(expense['date']) for expense in expenses]
+        self.cents[self.size:end] = [to_cents(expense['amount']) for expense in expenses]
+        self.codes[self.size:end] = [self.category_code(expense['category']) for expense in expenses]
+        self.descriptions.extend(expense['description'] for expense in expenses)
+        self.size = end
+    
+    def append(self, expense):
+        """Append one expense dict."""
+        self.extend([expense])
+    
+    def extend_columns(self, columns):
+        """Append rows from a snapshot's columns without building dicts."""
+        rows = len(columns['days'])
+        self.reserve(rows)
+        end = self.size + rows
+        recode = np.array([self.category_code(category) for category in columns['categories']], dtype=np.int32)
+        self.days[self.size:end] = columns['days']
+        self.cents[self.size:end] = columns['cents']
+        if rows:
+            self.codes[self.size:end] = recode[np.asarray(columns['codes'], dtype=np.int32)]
+        self.descriptions.extend(columns['descriptions'])
+        self.size = end
+    
+    def columns(self):
+        """The ledger as plain column lists for a snapshot."""
+        return {
+            'days': self.days[:self.size].tolist(),
+            'cents': self.cents[:self.size].tolist(),
+            'categories': list(self.categories),
+            'codes': self.codes[:self.size].tolist(),
+            'descriptions': list(self.descriptions)
+        }
+    
+    def row(self, i):
+        """Row i as an expense dict."""
+        return {
+            "date": day_string(int(self.days[i])),
+            "amount": int(self.cents[i]) / 100,
+            "category": self.categories[self.codes[i]],
+            "description": self.descriptions[i]
+        }
+    
+    def rows(self, mask=None):
+        """Yield expense dicts, optionally only where mask is set."""
+        indexes = range(self.size) if mask is None else np.flatnonzero(mask)
+        for i in indexes:
+            yield self.row(i)
+    
+    def between(self, start, end):
+        """Boolean mask of rows dated start..end (YYYY-MM-DD, inclusive)."""
+        days = self.days[:self.size]
+        return (days >= day_number(start)) & (days <= day_number(end))
+    
+    def total(self, mask=None):
+        """Total amount, optionally over masked rows only."""
+        cents = self.cents[:self.size]
+        if mask is not None:
+            cents = cents[mask]
+        return int(cents.sum()) / 100
+    
+    def by_category(self, mask=None):
+        """Total amount per category name."""
+        codes, cents = self.codes[:self.size], self.cents[:self.size]
+        if mask is not None:
+            codes, cents = codes[mask], cents[mask]
+        sums = np.bincount(codes, weights=cents, minlength=len(self.categories))
+        counts = np.bincount(codes, minlength=len(self.categories))
+        return {self.categories[code]: round(sums[code]) / 100
+                for code in np.flatnonzero(counts)}
+    
+    def by_month(self, mask=None):
+        """Total amount per YYYY-MM month."""
+        days, cents = self.days[:self.size], self.cents[:self.size]
+        if mask is not None:
+            days, cents = days[mask], cents[mask]
+        if not len(days):
+            return {}
+        # Map each day in the span to a month index with a small lookup table
+        first, last = int(days.min()), int(days.max())
+        month_names = [day_string(day)[:7] for day in range(first, last + 1)]
+        months = sorted(set(month_names))
+        month_index = {month: i for i, month in enumerate(months)}
+        table = np.array([month_index[month] for month in month_names], dtype=np.int32)
+        codes = table[days - first]
+        sums = np.bincount(codes, weights=cents, minlength=len(months))
+        counts = np.bincount(codes, minlength=len(months))
+        return {months[i]: round(sums[i]) / 100 for i in np.flatnonzero(counts)}
+
+# Description patterns for inferring an imported expense's category, first match wins
+CATEGORY_RULES = [
+    (r'grocer|supermarket|market|bakery|restaurant|cafe|coffee|pizza|burger|deli', 'food'),
+    (r'uber|lyft|taxi|metro|transit|\bbus\b|train|fuel|gas station|parking', 'transport'),
+    (r'netflix|spotify|cinema|movie|theat|steam|concert', 'entertainment'),
+    (r'\brent\b|landlord|mortgage', 'rent'),
+    (r'electric|water|internet|phone|utilit', 'utilities'),
+    (r'pharmacy|doctor|dental|clinic|hospital', 'health'),
+    (r'amazon|store|shop|mall', 'shopping'),
+    (r'airline|hotel|airbnb|booking', 'travel')
+]
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y', '%Y%m%d')
+
+CSV_COLUMNS = {
+    'date': ('date', 'posted', 'posting date', 'transaction date', 'booking date'),
+    'amount': ('amount', 'value'),
+    'debit': ('debit', 'withdrawal', 'withdrawals'),
+    'credit': ('credit', 'deposit', 'deposits'),
+    'description': ('description', 'memo', 'payee', 'name', 'details'),
+    'category': ('category',)
+}
+
+class CategoryRules:
+    """Rule table compiled into one regex; the matching group names the category."""
+    def __init__(self, rules=CATEGORY_RULES, default="other"):
+        self.categories = [category for _, category in rules]
+        self.default = default
+        self.pattern = re.compile('|'.join(f'(?P<r{i}>{pattern})' for i, (pattern, _) in enumerate(rules)),
+                                  re.IGNORECASE)
+    
+    def categorize(self, description):
+        """Category of the first rule matching the description."""
+        match = self.pattern.search(description)
+        if match is None:
+            return self.default
+        return self.categories[int(match.lastgroup[1:])]
+
+@lru_cache(maxsize=65536)
+def categorize_cached(rules, description):
+    """rules.categorize(description), memoized since bank descriptions repeat a lot."""
+    return rules.categorize(description)
+
+@lru_cache(maxsize=4096)
+def parse_date(text):
+    """ISO date of a bank export date in any of DATE_FORMATS, or None."""
+    text = text.strip()[:10]
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+def parse_amount(text):
+    """Amount of a bank export field such as '-1,234.50', '$12' or '(12.00)'."""
+    text = text.strip().replace(',', '').replace('$', '')
+    if text.startswith('(') and text.endswith(')'):
+        return -float(text[1:-1])
+    return float(text)
+
+def debit_credit_amount(debit, credit):
+    """Signed amount text of a debit/credit column pair, debits negative like a single amount column."""
+    debit = debit.strip()
+    if debit:
+        return debit[1:] if debit.startswith('-') else f"-{debit}"
+    return credit.strip()
+
+def read_csv_records(path, chunk_rows):
+    """Yield lists of (date, amount, description, category) text records from a CSV export."""
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader, [])]
+        positions = {}
+        for field, aliases in CSV_COLUMNS.items():
+            positions[field] = next((header.index(alias) for alias in aliases if alias in header), None)
+        # Exports without an amount column split it into debit and credit columns
+        split_amount = positions['amount'] is None
+        if positions['date'] is None or (split_amount and positions['debit'] is None and positions['credit'] is None):
+            raise ValueError(f"{path} needs date and amount (or debit/credit) columns, found {header}")
+        
+        def field(row, name):
+            position = positions[name]
+            return row[position] if position is not None and position < len(row) else ""
+        
+        # Full-width rows get one "" appended, which absent columns point at
+        width = len(header)
+        record = itemgetter(*(width if positions[name] is None else positions[name]
+                              for name in ('date', 'amount', 'description', 'category')))
+        chunk = []
+        for row in reader:
+            if len(row) == width:
+                row.append("")
+                values = record(row)
+            else:
+                values = (field(row, 'date'), field(row, 'amount'), field(row, 'description'), field(row, 'category'))
+            if split_amount:
+                values = (values[0], debit_credit_amount(field(row, 'debit'), field(row, 'credit')), values[2], values[3])
+            chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+OFX_TAG_PATTERN = re.compile(r'<(/?\w+)>([^<\r\n]*)')
+
+def read_ofx_records(path, chunk_rows):
+    """Yield lists of text records from the <STMTTRN> blocks of an OFX export."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        chunk = []
+        transaction = None
+        for line in f:
+            for tag, value in OFX_TAG_PATTERN.findall(line):
+                tag = tag.upper()
+                if tag == 'STMTTRN':
+                    transaction = {}
+                elif tag == '/STMTTRN' and transaction is not None:
+                    description = transaction.get('NAME', '')
+                    if transaction.get('MEMO'):
+                        description = f"{description} {transaction['MEMO']}".strip()
+                    chunk.append((transaction.get('DTPOSTED', '')[:8], transaction.get('TRNAMT', ''), description, ""))
+                    transaction = None
+                    if len(chunk) >= chunk_rows:
+                        yield chunk
+                        chunk = []
+                elif transaction is not None and not tag.startswith('/'):
+                    transaction[tag] = value.strip()
+        if chunk:
+            yield chunk
+
+def parse_records(records, rules, negative_is_expense=True):
+    """Turn text records into expense dicts; returns (expenses, skipped count).
+    
+    Bank exports list spending as negative amounts, so by default only those
+    are kept (as positive amounts) and credits are skipped.
+    """
+    expenses = []
+    skipped = 0
+    sign = -1 if negative_is_expense else 1
+    for date_text, amount_text, description, category in records:
+        date = parse_date(date_text)
+        try:
+            amount = parse_amount(amount_text) * sign
+        except ValueError:
+            amount = None
+        if date is None or amount is None or amount <= 0:
+            skipped += 1
+            continue
+        description = description.strip()
+        expenses.append({
+            "date": date,
+            "amount": amount,
+            "category": category.strip() or categorize_cached(rules, description),
+            "description": description
+        })
+    return expenses, skipped
+
+# Settings of the import a worker process parses for, set once by its initializer
+# so the rules object (and its categorize_cached entries) is shared by every chunk
+worker_settings = None
+
+def init_import_worker(rules, negative_is_expense):
+    """Install the parse settings once per worker process."""
+    global worker_settings
+    worker_settings = (rules, negative_is_expense)
+
+def parse_worker_records(records):
+    """parse_records() with the settings installed by init_import_worker."""
+    return parse_records(records, *worker_settings)
+
+def parse_chunks(chunks, workers, rules, negative_is_expense=True):
+    """Parse record chunks in order, in up to workers processes with bounded lookahead."""
+    if workers <= 1:
+        for records in chunks:
+            yield parse_records(records, rules, negative_is_expense)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_import_worker,
+                             initargs=(rules, negative_is_expense)) as pool:
+        pending = deque()
+        for records in chunks:
+            pending.append(pool.submit(parse_worker_records, records))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def expense_key(expense):
+    """Dedupe key of an expense: its date, amount in cents and description."""
+    return hash((expense['date'], to_cents(expense['amount']), expense['description']))
+
+
+class DateIndex:
+    """Row positions sorted by day, with prefix sums of cents for O(log N) range totals.
+    
+    Rows arriving in date order are appended directly; older dates wait in
+    self.unsorted and are merged in by settle() before the next query.
+    """
+    def __init__(self):
+        self.days = array('i')
+        self.positions = array('q')
+        self.prefix = array('q', [0])
+        self.unsorted = []
+    
+    @classmethod
+    def build(cls, days, cents, positions):
+        """Index rows given as parallel day, cents and position sequences."""
+        index = cls()
+        if np is not None:
+            days = np.asarray(days, dtype=np.int32)
+            order = np.argsort(days, kind='stable')
+            index.days.frombytes(days[order].tobytes())
+            index.positions.frombytes(np.asarray(positions, dtype=np.int64)[order].tobytes())
+            index.prefix.frombytes(np.cumsum(np.asarray(cents, dtype=np.int64)[order]).tobytes())
+            return index
+        
+        order = sorted(range(len(days)), key=days.__getitem__)
+        index.days.extend(days[i] for i in order)
+        index.positions.extend(positions[i] for i in order)
+        total = 0
+        for i in order:
+            total += cents[i]
+            index.prefix.append(total)
+        return index
+    
+    def __len__(self):
+        return len(self.days) + len(self.unsorted)
+    
+    def add(self, day, cents, position):
+        """Index one new row."""
+        if self.unsorted or (self.days and day < self.days[-1]):
+            self.unsorted.append((day, cents, position))
+            return
+        self.days.append(day)
+        self.positions.append(position)
+        self.prefix.append(self.prefix[-1] + cents)
+    
+    def settle(self):
+        """Merge rows added out of date order into the sorted arrays."""
+        if not self.unsorted:
+            return
+        rows = [(self.days[i], self.prefix[i + 1] - self.prefix[i], self.positions[i])
+                for i in range(len(self.days))]
+        rows.extend(self.unsorted)
+        days, cents, positions = zip(*rows)
+        merged = DateIndex.build(list(days), list(cents), list(positions))
+        self.days, self.positions, self.prefix = merged.days, merged.positions, merged.prefix
+        self.unsorted = []
+    
+    def span(self, start_day, end_day):
+        """Index range [lo, hi) of rows dated start_day..end_day (empty if reversed)."""
+        self.settle()
+        lo = bisect_left(self.days, start_day)
+        return lo, max(lo, bisect_right(self.days, end_day))
+    
+    def total(self, start_day, end_day):
+        """Total cents of rows dated start_day..end_day."""
+        lo, hi = self.span(start_day, end_day)
+        return self.prefix[hi] - self.prefix[lo]
 
 
 class ExpenseTracker:
-    def __init__(self, filename="expenses.json"):
+    def __init__(self, filename="expenses.json", columnar=False, storage=None):
+        # filename is the classic JSON list; it is migrated into the journal once
         self.filename = filename
-        self.expenses = self.load_expenses()
+        base = filename[:-len(".json")] if filename.endswith(".json") else filename
+        self.storage = storage or ExpenseJournal(base)
+        # Columnar mode keeps the expenses in a NumPy ledger instead of dicts
+        self.ledger = None
+        self.expenses = []
+        # Materialized totals, kept current on insert and saved in the snapshot
+        self.rollups = Rollups()
+        # Counts of expense_key() over stored rows, built by the first import
+        self.dedupe_index = None
+        # DateIndex over all rows and per category, built by the first range query
+        self.date_index = None
+        self.category_indexes = None
+        if columnar:
+            if np is None:
+                raise ImportError("Columnar mode needs NumPy")
+            self.ledger = ColumnarLedger()
+        
+        if not self.storage.exists() and os.path.exists(filename):
+            self.store_rows(self.load_expenses())
+            self.save_expenses()
+        else:
+            snapshot, tail = self.storage.load()
+            if snapshot is not None:
+                self.restore(snapshot)
+            self.store_rows(tail)
     
     def load_expenses(self):
-        """Load expenses from file."""
+        """Load expenses from the classic JSON file."""
         try:
             with open(self.filename, 'r') as f:
                 return json.load(f)
         except FileNotFoundError:
             return []
     
+    def restore(self, snapshot):
+        """Load the rows of a snapshot."""
+        if self.ledger is not None:
+            self.ledger.extend_columns(snapshot['columns'])
+        else:
+            self.expenses.extend(columns_to_expenses(snapshot['columns']))
+        if 'rollups' in snapshot:
+            self.rollups = Rollups.from_dict(snapshot['rollups'])
+        else:
+            self.rollups = self.build_rollups()
+    
+    def snapshot(self):
+        """Everything the snapshot file holds."""
+        if self.ledger is not None:
+            columns = self.ledger.columns()
+        else:
+            columns = expenses_to_columns(self.expenses)
+        return {'columns': columns, 'rollups': self.rollups.to_dict()}
+    
+    def build_rollups(self):
+        """Rollups computed from scratch over every expense."""
+        rollups = Rollups()
+        rollups.add(self.all_expenses())
+        return rollups
+    
+    def check_rollups(self):
+        """Rebuild the rollups and list any group where the maintained totals differ."""
+        return self.rollups.differences(self.build_rollups())
+    
     def save_expenses(self):
-        """Save expenses to file."""
-        with open(self.filename, 'w') as f:
-            json.dump(self.expenses, f, indent=2)
+        """Write every expense to a fresh snapshot."""
+        self.storage.compact(self.snapshot())
+    
+    def close(self):
+        """Close the underlying journal."""
+        self.storage.close()
+    
+    def store_rows(self, expenses):
+        """Add expense dicts to memory and the rollups only."""
+        position = self.count()
+        if self.ledger is not None:
+            self.ledger.extend(expenses)
+        else:
+            self.expenses.extend(expenses)
+        self.rollups.add(expenses)
+        if self.dedupe_index is not None:
+            self.dedupe_index.update(map(expense_key, expenses))
+        if self.date_index is not None:
+            for position, expense in enumerate(expenses, position):
+                day, cents = day_number(expense['date']), to_cents(expense['amount'])
+                self.date_index.add(day, cents, position)
+                if expense['category'] not in self.category_indexes:
+                    self.category_indexes[expense['category']] = DateIndex()
+                self.category_indexes[expense['category']].add(day, cents, position)
+    
+    def add_expenses(self, expenses):
+        """Add many expenses with one journal write; returns how many were added."""
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        expenses = [{
+            "date": expense.get("date") or today,
+            "amount": float(expense["amount"]),
+            "category": expense["category"],
+            "description": expense.get("description", "")
+        } for expense in expenses]
+        if not expenses:
+            return 0
+        # Check every date before storing any row, so one bad row rejects the batch
+        for expense in expenses:
+            try:
+                valid = day_string(day_number(expense['date'])) == expense['date']
+            except (TypeError, ValueError):
+                valid = False
+            if not valid:
+                raise ValueError(f"Invalid date {expense['date']!r}, expected YYYY-MM-DD")
+        
+        self.store_rows(expenses)
+        self.storage.append(expenses)
+        if self.storage.wants_compaction(self.count()):
+            self.save_expenses()
+        return len(expenses)
+    
+    def import_file(self, path, file_format=None, chunk_rows=50000, workers=1,
+                    rules=None, negative_is_expense=True):
+        """Stream a CSV or OFX bank export into the tracker.
+        
+        Records are parsed chunk by chunk (in worker processes if workers > 1),
+        rows already stored are skipped through a hash index, and each chunk
+        is written with one add_expenses call, so memory stays bounded by the
+        chunk size. Returns counts of rows read, added, duplicate and skipped.
+        """
+        rules = rules or CategoryRules()
+        file_format = file_format or ('ofx' if path.lower().endswith(('.ofx', '.qfx')) else 'csv')
+        reader = read_ofx_records if file_format == 'ofx' else read_csv_records
+        
+        existing = self.dedupe_index
+        if existing is None:
+            existing = Counter(map(expense_key, self.all_expenses()))
+        # A row is new once it occurs more often in the file than in storage,
+        # so re-imported statements are skipped but repeated purchases are kept.
+        # The index is detached meanwhile so it reflects storage before the import.
+        self.dedupe_index = None
+        seen = Counter()
+        added_keys = []
+        
+        started = time.perf_counter()
+        result = {'rows': 0, 'added': 0, 'duplicates': 0, 'skipped': 0}
+        try:
+            for expenses, skipped in parse_chunks(reader(path, chunk_rows), workers, rules, negative_is_expense):
+                result['rows'] += len(expenses) + skipped
+                result['skipped'] += skipped
+                new_expenses = []
+                for expense in expenses:
+                    key = expense_key(expense)
+                    if key in existing:
+                        seen[key] += 1
+                        if seen[key] <= existing[key]:
+                            result['duplicates'] += 1
+                            continue
+                    new_expenses.append(expense)
+                    added_keys.append(key)
+                result['added'] += self.add_expenses(new_expenses)
+        finally:
+            existing.update(added_keys)
+            self.dedupe_index = existing
+        result['seconds'] = time.perf_counter() - started
+        return result
     
     def add_expense(self, amount, category, description=""):
         """Add a new expense."""
-        expense = {
-            "date": datetime.datetime.now().strftime("%Y-%m-%d"),
-            "amount": float(amount),
-            "category": category,
-            "description": description
-        }
-        self.expenses.append(expense)
-        self.save_expenses()
+        self.add_expenses([{"amount": amount, "category": category, "description": description}])
         print(f"Added expense: ${amount} for {category}")
     
+    def count(self):
+        """Number of recorded expenses."""
+        return len(self.ledger) if self.ledger is not None else len(self.expenses)
+    
+    def all_expenses(self):
+        """Yield every expense as a dict."""
+        if self.ledger is not None:
+            return self.ledger.rows()
+        return iter(self.expenses)
+    
+    def expense_at(self, position):
+        """The expense stored at a row position."""
+        if self.ledger is not None:
+            return self.ledger.row(position)
+        return self.expenses[position]
+    
+    def build_date_indexes(self):
+        """Build the date index over all rows and one per category."""
+        if self.ledger is not None:
+            size = self.ledger.size
+            days, cents, codes = self.ledger.days[:size], self.ledger.cents[:size], self.ledger.codes[:size]
+            self.date_index = DateIndex.build(days, cents, np.arange(size))
+            self.category_indexes = {}
+            for code, category in enumerate(self.ledger.categories):
+                positions = np.flatnonzero(codes == code)
+                self.category_indexes[category] = DateIndex.build(days[positions], cents[positions], positions)
+            return
+        
+        days = [day_number(expense['date']) for expense in self.expenses]
+        cents = [to_cents(expense['amount']) for expense in self.expenses]
+        self.date_index = DateIndex.build(days, cents, range(len(days)))
+        by_category = defaultdict(list)
+        for position, expense in enumerate(self.expenses):
+            by_category[expense['category']].append(position)
+        self.category_indexes = {
+            category: DateIndex.build([days[i] for i in positions], [cents[i] for i in positions], positions)
+            for category, positions in by_category.items()
+        }
+    
+    def range_index(self, category=None):
+        """The DateIndex for all rows or for one category (None if it has no rows)."""
+        if self.date_index is None:
+            self.build_date_indexes()
+        if category is None:
+            return self.date_index
+        return self.category_indexes.get(category)
+    
+    def between(self, start, end, category=None, min_amount=None, max_amount=None):
+        """Yield expenses dated start..end (YYYY-MM-DD, inclusive) in date order.
+        
+        category, min_amount and max_amount narrow the result further.
+        """
+        index = self.range_index(category)
+        if index is None:
+            return
+        lo, hi = index.span(day_number(start), day_number(end))
+        for i in range(lo, hi):
+            expense = self.expense_at(index.positions[i])
+            if min_amount is not None and expense['amount'] < min_amount:
+                continue
+            if max_amount is not None and expense['amount'] > max_amount:
+                continue
+            yield expense
+    
+    def total_between(self, start, end, category=None):
+        """Total spent from start to end (inclusive), in O(log N) from prefix sums."""
+        index = self.range_index(category)
+        if index is None:
+            return 0.0
+        return index.total(day_number(start), day_number(end)) / 100
+    
+    def total_spent(self, start=None, end=None):
+        """Total amount, optionally only for dates start..end (inclusive)."""
+        if not start:
+            return sum(self.rollups.by_category.values()) / 100
+        return self.scan_total(start, end)
+    
+    def category_totals(self, start=None, end=None):
+        """Total amount per category, optionally only for dates start..end."""
+        if not start:
+            return {category: cents / 100 for category, cents in self.rollups.by_category.items()}
+        return self.scan_category_totals(start, end)
+    
+    def month_totals(self, start=None, end=None):
+        """Total amount per YYYY-MM month, optionally only for dates start..end."""
+        if not start:
+            return {month: cents / 100 for month, cents in self.rollups.by_month.items()}
+        return self.scan_month_totals(start, end)
+    
+    def scan_total(self, start=None, end=None):
+        """total_spent() computed from the rows instead of the rollups."""
+        if self.ledger is not None:
+            mask = self.ledger.between(start, end) if start else None
+            return self.ledger.total(mask)
+        return sum(expense['amount'] for expense in self.expenses
+                   if not start or start <= expense['date'] <= end)
+    
+    def scan_category_totals(self, start=None, end=None):
+        """category_totals() computed from the rows instead of the rollups."""
+        if self.ledger is not None:
+            mask = self.ledger.between(start, end) if start else None
+            return self.ledger.by_category(mask)
+        categories = defaultdict(float)
+        for expense in self.expenses:
+            if not start or start <= expense['date'] <= end:
+                categories[expense['category']] += expense['amount']
+        return dict(categories)
+    
+    def scan_month_totals(self, start=None, end=None):
+        """month_totals() computed from the rows instead of the rollups."""
+        if self.ledger is not None:
+            mask = self.ledger.between(start, end) if start else None
+            return self.ledger.by_month(mask)
+        months = defaultdict(float)
+        for expense in self.expenses:
+            if not start or start <= expense['date'] <= end:
+                months[expense['date'][:7]] += expense['amount']
+        return dict(months)
+    
+    def day_totals(self):
+        """Total amount per YYYY-MM-DD day, from the rollups."""
+        return {day: cents / 100 for day, cents in self.rollups.by_day.items()}
+    
+    def category_month_totals(self):
+        """Total amount per category per YYYY-MM month, from the rollups."""
+        return {category: {month: cents / 100 for month, cents in months.items()}
+                for category, months in self.rollups.by_category_month.items()}
+    
     def view_expenses(self):
         """Display all expenses."""
-        if not self.expenses:
+        if not self.count():
             print("No expenses recorded yet.")
             return
         
         print("\n=== All Expenses ===")
-        total = 0
-        for expense in self.expenses:
+        for expense in self.all_expenses():
             print(f"{expense['date']} | ${expense['amount']:.2f} | {expense['category']} | {expense['description']}")
-            total += expense['amount']
-        print(f"\nTotal spent: ${total:.2f}")
+        print(f"\nTotal spent: ${self.total_spent():.2f}")
     
     def view_by_category(self):
         """Display expenses grouped by category."""
-        if not self.expenses:
+        if not self.count():
             print("No expenses recorded yet.")
             return
         
-        categories = defaultdict(float)
-        for expense in self.expenses:
-            categories[expense['category']] += expense['amount']
+        categories = self.category_totals()
         
         print("\n=== Expenses by Category ===")
         for category, amount in sorted(categories.items()):
             print(f"{category}: ${amount:.2f}")
+    
+    def view_by_month(self):
+        """Display expenses grouped by month."""
+        if not self.count():
+            print("No expenses recorded yet.")
+            return
+        
+        print("\n=== Expenses by Month ===")
+        for month, amount in sorted(self.month_totals().items()):
+            print(f"{month}: ${amount:.2f}")
+
+    def view_between(self, start, end, category=None, min_amount=None, limit=50):
+        """Display the expenses of a date range and its totals."""
+        # Check both dates before printing anything
+        day_number(start), day_number(end)
+        label = f" in {category}" if category else ""
+        print(f"\n=== Expenses{label} from {start} to {end} ===")
+        shown = 0
+        matched_total = 0
+        for expense in self.between(start, end, category, min_amount):
+            if shown < limit:
+                print(f"{expense['date']} | ${expense['amount']:.2f} | {expense['category']} | {expense['description']}")
+            shown += 1
+            matched_total += expense['amount']
+        if shown > limit:
+            print(f"... and {shown - limit:,} more")
+        if min_amount is not None:
+            print(f"\n{shown:,} expenses of at least ${min_amount:.2f}: ${matched_total:.2f}")
+        print(f"\nTotal spent{label}: ${self.total_between(start, end, category):.2f}")
+
+def sample_expenses(num_rows, seed=0):
+    """Random expenses over the last three years, as dicts sharing date strings."""
+    rng = random.Random(seed)
+    today = datetime.date.today().toordinal()
+    dates = [day_string(day) for day in range(today - 3 * 365, today + 1)]
+    categories = ['food', 'transport', 'entertainment', 'rent', 'utilities', 'health', 'shopping', 'travel']
+    return [{"date": rng.choice(dates), "amount": rng.randint(1, 50000) / 100,
+             "category": rng.choice(categories), "description": ""}
+            for _ in range(num_rows)]
+
+def benchmark(num_rows=10000000):
+    """Compare dict-loop aggregations against the columnar ledger."""
+    if np is None:
+        print("❌ The columnar benchmark needs NumPy.")
+        return
+    
+    start, end = day_string(datetime.date.today().toordinal() - 365), day_string(datetime.date.today().toordinal())
+    
+    def aggregate(tracker):
+        # The scan helpers, since full-range totals would come from the rollups
+        return (tracker.scan_total(), tracker.scan_category_totals(), tracker.scan_month_totals(),
+                tracker.scan_total(start, end))
+    
+    # Rows are stored in memory only; nothing is written to the throwaway journals
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "expenses.json")
+        tracker = ExpenseTracker(filename)
+        tracker.store_rows(sample_expenses(num_rows))
+        began = time.perf_counter()
+        expected = aggregate(tracker)
+        dict_seconds = time.perf_counter() - began
+        expenses = tracker.expenses
+        tracker.close()
+        del tracker
+        
+        columnar = ExpenseTracker(filename, columnar=True)
+        began = time.perf_counter()
+        columnar.store_rows(expenses)
+        build_seconds = time.perf_counter() - began
+        del expenses
+        
+        began = time.perf_counter()
+        result = aggregate(columnar)
+        columnar_seconds = time.perf_counter() - began
+        columnar.close()
+    
+    for dict_value, columnar_value in zip(expected, result):
+        if isinstance(dict_value, dict):
+            assert dict_value.keys() == columnar_value.keys()
+            assert all(abs(dict_value[key] - columnar_value[key]) < 0.01 * num_rows ** 0.5 for key in dict_value)
+        else:
+            assert abs(dict_value - columnar_value) < 0.01 * num_rows ** 0.5
+    
+    print(f"\n📊 Total, by category, by month and last-year total over {num_rows:,} expenses:")
+    print(f"Dict loop:  {dict_seconds:.3f}s")
+    print(f"Columnar:   {columnar_seconds:.3f}s ({dict_seconds / columnar_seconds:.0f}x)")
+    ledger = columnar.ledger
+    print(f"One-time columnar load (with rollups): {build_seconds:.3f}s "
+          f"({ledger.days.itemsize + ledger.cents.itemsize + ledger.codes.itemsize} bytes/row of numeric columns)")
+
+def check(filename="expenses.json"):
+    """Verify the saved rollups against a full rebuild."""
+    tracker = ExpenseTracker(filename)
+    problems = tracker.check_rollups()
+    tracker.close()
+    if problems:
+        print(f"❌ {len(problems)} rollup totals are inconsistent:")
+        for problem in problems:
+            print(f"  {problem}")
+    else:
+        print(f"✅ Rollups match all {tracker.count():,} expenses.")
+    return not problems
+
+def print_import(result):
+    """Print an import_file() result."""
+    rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+    print(f"Imported {result['added']:,} of {result['rows']:,} rows "
+          f"({result['duplicates']:,} duplicates, {result['skipped']:,} skipped) "
+          f"in {result['seconds']:.2f}s, {rate:,.0f} rows/s")
 
 def main():
-    tracker = ExpenseTracker()
+    tracker = ExpenseTracker(columnar=np is not None)
     
     while True:
         print("\n=== Personal Expense Tracker ===")
         print("1. Add expense")
         print("2. View all expenses")
         print("3. View by category")
-        print("4. Exit")
+        print("4. View by month")
+        print("5. Import bank statement (CSV/OFX)")
+        print("6. Query a date range")
+        print("7. Exit")
         
-        choice = input("Choose an option (1-4): ")
+        choice = input("Choose an option (1-7): ")
         
         if choice == "1":
             try:
@@ -88,6 +1002,28 @@ def main():
             tracker.view_by_category()
         
         elif choice == "4":
+            tracker.view_by_month()
+        
+        elif choice == "5":
+            path = input("Enter CSV or OFX file: ").strip()
+            try:
+                print_import(tracker.import_file(path))
+            except (OSError, ValueError) as e:
+                print(f"Import failed: {e}")
+        
+        elif choice == "6":
+            try:
+                start = input("Start date (YYYY-MM-DD): ").strip()
+                end = input("End date (YYYY-MM-DD): ").strip()
+                category = input("Category (optional): ").strip() or None
+                min_amount = input("Minimum amount (optional): $").strip()
+                min_amount = float(min_amount) if min_amount else None
+                tracker.view_between(start, end, category, min_amount)
+            except ValueError:
+                print("Invalid date or amount.")
+        
+        elif choice == "7":
+            tracker.close()
             print("Goodbye!")
             break
         
@@ -95,4 +1031,15 @@ def main():
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["benchmark"]:
+        benchmark()
+    elif sys.argv[1:] == ["check"]:
+        sys.exit(0 if check() else 1)
+    elif len(sys.argv) in (3, 4) and sys.argv[1] == "import":
+        # python expense_tracker.py import FILE [WORKERS]
+        tracker = ExpenseTracker(columnar=np is not None)
+        workers = int(sys.argv[3]) if len(sys.argv) == 4 else 1
+        print_import(tracker.import_file(sys.argv[2], workers=workers))
+        tracker.close()
+    else:
+        main()
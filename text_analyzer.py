@@ -1,20 +1,1048 @@
+import hashlib
+import heapq
+import json
+import math
+import os
 import re
+import random
+import sys
+import time
+from array import array
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
 import string
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+TOKEN_PATTERN = re.compile(r'\n\n|\S+')
+SENTENCE_END_PATTERN = re.compile(r'[.!?]+')
+
+SYLLABLE_CACHE_SIZE = 100000
+NUMPY_BATCH_MIN_WORDS = 2000
+
+# Bump when tokenizing or any derived figure changes, to retire cached results
+ANALYZER_VERSION = "2"
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
+def count_word_syllables(word):
+    """Count syllables in a word (approximation), memoized per distinct word."""
+    word = word.lower()
+    count = 0
+    vowels = 'aeiouy'
+    
+    if word[0] in vowels:
+        count += 1
+    
+    for i in range(1, len(word)):
+        if word[i] in vowels and word[i-1] not in vowels:
+            count += 1
+    
+    if word.endswith('e'):
+        count -= 1
+    
+    if count == 0:
+        count = 1
+    
+    return count
+
+def batch_syllables(words):
+    """Count syllables for a list of words at once with NumPy.
+    
+    Same heuristic as count_word_syllables: a syllable starts at every
+    vowel not preceded by a vowel, a final 'e' is silent, minimum one.
+    """
+    words = [word.lower() for word in words]
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+    starts = np.zeros(len(words), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    
+    characters = np.frombuffer(''.join(words).encode('utf-32-le'), dtype=np.uint32)
+    is_vowel = np.isin(characters, np.array([ord(vowel) for vowel in 'aeiouy'], dtype=np.uint32))
+    after_consonant = np.ones(len(characters), dtype=bool)
+    after_consonant[1:] = ~is_vowel[:-1]
+    after_consonant[starts] = True
+    
+    counts = np.add.reduceat((is_vowel & after_consonant).astype(np.int64), starts)
+    counts -= characters[starts + lengths - 1] == ord('e')
+    counts[counts == 0] = 1
+    return counts
+
+def total_syllables(word_counts, count_syllables=count_word_syllables):
+    """Total syllables over a Counter of words, counting each distinct word once."""
+    if np is not None and count_syllables is count_word_syllables and len(word_counts) >= NUMPY_BATCH_MIN_WORDS:
+        frequencies = np.fromiter(word_counts.values(), dtype=np.int64, count=len(word_counts))
+        return int((batch_syllables(list(word_counts)) * frequencies).sum())
+    return sum(count_syllables(word) * count for word, count in word_counts.items())
+
+def normalize_word(token):
+    """Lowercase a token and strip punctuation, like extract_words."""
+    return token.lower().translate(PUNCTUATION_TABLE)
+
+class Lexicon:
+    """Sentiment scores and stop words compiled for constant-time lookups.
+    
+    Single words live in a dict and stop words in a frozenset. Multi-word
+    phrases are keyed by their word tuple, with phrase_lengths listing the
+    phrase lengths that start with each word (longest first), so matching
+    costs one dict lookup per word however large the lexicon is.
+    """
+    def __init__(self, scores=None, stop_words=(), sources=()):
+        self.word_scores = {}
+        self.phrase_scores = {}
+        self.phrase_lengths = {}
+        for entry, score in (scores or {}).items():
+            self.add(entry, score)
+        self.stop_words = frozenset(normalize_word(word) for word in stop_words)
+        self.sources = tuple(sources)
+        self.max_phrase_length = max((lengths[0] for lengths in self.phrase_lengths.values()), default=1)
+        
+        content = repr((sorted(self.word_scores.items()), sorted(self.phrase_scores.items()),
+                        sorted(self.stop_words)))
+        self.version = hashlib.sha1(content.encode('utf-8')).hexdigest()[:12]
+    
+    def add(self, entry, score):
+        """Add a word or phrase with its sentiment score."""
+        words = tuple(word for word in map(normalize_word, entry.split()) if word)
+        if len(words) == 1:
+            self.word_scores[words[0]] = score
+        elif words:
+            self.phrase_scores[words] = score
+            lengths = self.phrase_lengths.setdefault(words[0], [])
+            if len(words) not in lengths:
+                lengths.append(len(words))
+                lengths.sort(reverse=True)
+    
+    @classmethod
+    def from_files(cls, sentiment_file=None, stop_words_file=None):
+        """Load lexicon files.
+        
+        The sentiment file has one 'word or phrase<TAB>score' entry per line
+        (AFINN style); the stop-word file has one word per line. Lines
+        starting with '#' are ignored. A file that isn't given falls back to
+        the built-in word list.
+        """
+        scores = {}
+        if sentiment_file:
+            with open(sentiment_file, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    entry, _, score = line.rpartition('\t') if '\t' in line else line.rpartition(' ')
+                    try:
+                        scores[entry] = int(score) if score.lstrip('+-').isdigit() else float(score)
+                    except ValueError:
+                        raise ValueError(f"{sentiment_file}:{line_number}: bad score '{score}'")
+        else:
+            scores = default_scores()
+        
+        stop_words = []
+        if stop_words_file:
+            with open(stop_words_file, 'r', encoding='utf-8') as f:
+                stop_words = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        else:
+            stop_words = TextAnalyzer.stop_words
+        
+        return cls(scores, stop_words, sources=(sentiment_file, stop_words_file))
+
+@lru_cache(maxsize=8)
+def load_lexicon(sentiment_file=None, stop_words_file=None):
+    """Load lexicon files once and share the compiled Lexicon."""
+    return Lexicon.from_files(sentiment_file, stop_words_file)
+
+def default_scores():
+    """Sentiment scores of the built-in positive and negative word lists."""
+    scores = {word: 1 for word in TextAnalyzer.positive_words}
+    scores.update({word: -1 for word in TextAnalyzer.negative_words})
+    return scores
+
+@lru_cache(maxsize=1)
+def default_lexicon():
+    """The built-in word lists as a shared Lexicon."""
+    return Lexicon(default_scores(), TextAnalyzer.stop_words)
+
+def stable_hash(word):
+    """64-bit hash of a word that is the same in every process."""
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'big')
+
+class FenwickTree:
+    """Prefix sums over a fixed number of slots, with O(log n) updates and searches."""
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] + list(values)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self.total = sum(values)
+    
+    def add(self, index, delta):
+        """Add delta to the value at index."""
+        self.total += delta
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+    
+    def prefix(self, index):
+        """Sum of the values before index."""
+        total = 0
+        while index:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+    
+    def find(self, offset):
+        """Index whose span [prefix(i), prefix(i + 1)) holds offset (size if none)."""
+        index = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            if index + step <= self.size and self.tree[index + step] <= offset:
+                index += step
+                offset -= self.tree[index]
+            step >>= 1
+        return index
+
+class SegmentTree:
+    """Ordered fold of `combine` over a fixed number of slots, with O(log n) updates."""
+    def __init__(self, values, combine, identity):
+        self.combine = combine
+        self.identity = identity
+        self.size = 1 << max(0, len(values) - 1).bit_length()
+        self.tree = [identity] * self.size + list(values) + [identity] * (self.size - len(values))
+        for i in range(self.size - 1, 0, -1):
+            self.tree[i] = combine(self.tree[2 * i], self.tree[2 * i + 1])
+    
+    def update(self, index, value):
+        """Replace the value at index."""
+        index += self.size
+        self.tree[index] = value
+        index //= 2
+        while index:
+            self.tree[index] = self.combine(self.tree[2 * index], self.tree[2 * index + 1])
+            index //= 2
+    
+    def total(self):
+        """combine() of every value, in slot order."""
+        return self.tree[1]
+
+# How a stretch of paragraphs changes the sentence count, for a stretch that
+# starts outside and inside an open sentence: (added, open after) for each
+NO_PARAGRAPHS = (0, False, 0, True)
+
+def sentence_state(piece_stats):
+    """The NO_PARAGRAPHS-style state of one paragraph's stats."""
+    if piece_stats is None:
+        return NO_PARAGRAPHS
+    run_on = piece_stats.ended_any and not piece_stats.first_end_closed
+    return (piece_stats.sentences, piece_stats.in_sentence,
+            piece_stats.sentences + run_on, piece_stats.in_sentence if piece_stats.ended_any else True)
+
+def chain_sentence_states(first, second):
+    """State of two stretches of paragraphs in a row."""
+    added, open_after = first[0], first[1]
+    added_open, open_after_open = first[2], first[3]
+    if open_after:
+        added, open_after = added + second[2], second[3]
+    else:
+        added, open_after = added + second[0], second[1]
+    if open_after_open:
+        added_open, open_after_open = added_open + second[2], second[3]
+    else:
+        added_open, open_after_open = added_open + second[0], second[1]
+    return (added, open_after, added_open, open_after_open)
+
+class MisraGries:
+    """Misra-Gries heavy hitters: at most `capacity` counters.
+    
+    Each kept count is a lower bound; the true count is at most
+    count + decremented, which never exceeds total / (capacity + 1).
+    """
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counters = Counter()
+        self.decremented = 0
+    
+    def add(self, counts):
+        """Add a batch of word counts."""
+        self.counters.update(counts)
+        self.shrink()
+    
+    def shrink(self):
+        """Subtract the (capacity + 1)-th largest count from every counter."""
+        if len(self.counters) <= self.capacity:
+            return
+        threshold = heapq.nlargest(self.capacity + 1, self.counters.values())[-1]
+        self.decremented += threshold
+        self.counters = Counter({word: count - threshold for word, count in self.counters.items()
+                                 if count > threshold})
+    
+    def merge(self, other):
+        """Combine with another summary (errors add up)."""
+        self.decremented += other.decremented
+        self.add(other.counters)
+
+class CountMinSketch:
+    """Count-Min sketch for point frequency queries.
+    
+    Estimates never undercount, and overcount by at most e/width of the
+    total with probability 1 - exp(-depth).
+    """
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = [array('Q', bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+    
+    def positions(self, word):
+        """Column for word in each row (double hashing from one 64-bit hash)."""
+        value = stable_hash(word)
+        first, second = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [(first + row * second) % self.width for row in range(self.depth)]
+    
+    def add(self, counts):
+        """Add a batch of word counts."""
+        for word, count in counts.items():
+            for row, column in zip(self.table, self.positions(word)):
+                row[column] += count
+            self.total += count
+    
+    def estimate(self, word):
+        """Estimated count of word."""
+        return min(row[column] for row, column in zip(self.table, self.positions(word)))
+    
+    def merge(self, other):
+        """Add another sketch with the same dimensions."""
+        for row, other_row in zip(self.table, other.table):
+            for column, count in enumerate(other_row):
+                row[column] += count
+        self.total += other.total
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**precision one-byte registers."""
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+    
+    def add(self, words):
+        """Add words (repeats don't matter)."""
+        value_bits = 64 - self.precision
+        for word in words:
+            value = stable_hash(word)
+            index = value >> value_bits
+            rest = value & ((1 << value_bits) - 1)
+            rank = value_bits - rest.bit_length() + 1
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+    
+    def count(self):
+        """Estimated number of distinct words."""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = self.size * math.log(self.size / zeros)
+        return round(estimate)
+    
+    def relative_error(self):
+        """Standard error of count() as a fraction."""
+        return 1.04 / math.sqrt(self.size)
+    
+    def merge(self, other):
+        """Combine with another counter of the same precision."""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+class FrequencySketch:
+    """Bounded-memory stand-in for the exact word frequency table."""
+    def __init__(self, top_k_capacity=1000, width=2048, depth=4, precision=14):
+        self.config = (top_k_capacity, width, depth, precision)
+        self.heavy_hitters = MisraGries(top_k_capacity)
+        self.point_counts = CountMinSketch(width, depth)
+        self.distinct = HyperLogLog(precision)
+        self.filtered_total = 0
+    
+    def empty_copy(self):
+        """A fresh sketch with the same settings."""
+        return FrequencySketch(*self.config)
+    
+    def add(self, word_counts, stop_words):
+        """Add a batch of word counts."""
+        filtered = {word: count for word, count in word_counts.items()
+                    if word not in stop_words and len(word) > 2}
+        self.filtered_total += sum(filtered.values())
+        self.heavy_hitters.add(filtered)
+        self.point_counts.add(word_counts)
+        self.distinct.add(word_counts)
+    
+    def merge(self, other):
+        """Combine with a sketch built with the same settings."""
+        self.filtered_total += other.filtered_total
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.point_counts.merge(other.point_counts)
+        self.distinct.merge(other.distinct)
+    
+    def memory_bytes(self):
+        """Memory held by the sketches, measured with sys.getsizeof."""
+        counters = self.heavy_hitters.counters
+        top_k = sys.getsizeof(counters) + sum(sys.getsizeof(word) + sys.getsizeof(count)
+                                              for word, count in counters.items())
+        table = self.point_counts.table
+        point = sys.getsizeof(table) + sum(sys.getsizeof(row) for row in table)
+        return top_k + point + sys.getsizeof(self.distinct.registers)
+    
+    def error_bounds(self):
+        """How far each approximate figure can be off."""
+        return {
+            'top_k_undercount': self.heavy_hitters.decremented,
+            'top_k_undercount_limit': self.filtered_total // (self.heavy_hitters.capacity + 1),
+            'point_overcount': math.e / self.point_counts.width * self.point_counts.total,
+            'point_confidence': 1 - math.exp(-self.point_counts.depth),
+            'distinct_relative_error': self.distinct.relative_error()
+        }
+
+class TextStats:
+    """Running totals behind every figure in the report.
+    
+    add_segment tokenizes each segment once and does the remaining work
+    per distinct token: words are normalized and counted per token type,
+    and only sentence and paragraph boundaries are tracked in text order.
+    Syllables, sentiment and the filtered frequency table are derived per
+    distinct word in finish(). Lexicon phrases need word order, so they
+    are matched in text order, and only when the lexicon has any.
+    
+    With a FrequencySketch, per-word totals are folded in segment by
+    segment and the full word table is never kept, so memory stays bounded.
+    """
+    def __init__(self, lexicon=None, sketch=None):
+        self.lexicon = lexicon
+        self.sketch = sketch
+        self.characters = 0
+        self.characters_no_spaces = 0
+        self.sentences = 0
+        self.paragraphs = 0
+        self.word_counts = Counter()
+        self.phrase_counts = Counter()
+        self.phrase_carry = []
+        self.in_sentence = False
+        self.in_paragraph = False
+        # Whether any sentence end was seen, and whether the first one closed a
+        # sentence; lets a paragraph's count be replayed after an open sentence
+        self.ended_any = False
+        self.first_end_closed = False
+        
+        # Derived from word_counts by finish() (running totals with a sketch)
+        self.words = 0
+        self.syllables = 0
+        self.score_counts = Counter()
+        self.positive = 0
+        self.negative = 0
+        self.frequencies = Counter()
+    
+    def add_segment(self, text):
+        """Add a segment of text that ends on a word boundary."""
+        self.characters += len(text)
+        self.characters_no_spaces += len(text) - text.count(' ')
+        
+        # One regex pass splits the segment into paragraph breaks and
+        # whitespace-separated tokens; everything else is per token type
+        tokens = TOKEN_PATTERN.findall(text)
+        token_counts = Counter(tokens)
+        
+        # For tokens with sentence ends: (starts inside a sentence,
+        # sentences closed within the token, ends inside a sentence)
+        shapes = {}
+        words_of = {}
+        word_counts = self.word_counts if self.sketch is None else Counter()
+        for token, count in token_counts.items():
+            if token == '\n\n':
+                shapes[token] = None
+                continue
+            if '.' in token or '!' in token or '?' in token:
+                pieces = SENTENCE_END_PATTERN.split(token)
+                inner = sum(1 for piece in pieces[1:-1] if piece)
+                shapes[token] = (pieces[0] != '', inner, pieces[-1] != '')
+            word = normalize_word(token)
+            if word:
+                word_counts[word] += count
+                words_of[token] = word
+        
+        if self.lexicon is not None and self.lexicon.phrase_lengths:
+            # None marks paragraph breaks, which phrases never span
+            self.match_phrases(self.phrase_carry + [words_of.get(token) for token in tokens
+                                                    if token in words_of or token == '\n\n'])
+        if self.sketch is not None:
+            self.words += sum(word_counts.values())
+            self.syllables += total_syllables(word_counts)
+            self.score_counts.update(self.scores_of(word_counts, self.lexicon))
+            self.sketch.add(word_counts, self.lexicon.stop_words)
+        
+        sentences = self.sentences
+        paragraphs = self.paragraphs
+        in_sentence = self.in_sentence
+        in_paragraph = self.in_paragraph
+        for token in tokens:
+            if token not in shapes:
+                in_sentence = in_paragraph = True
+                continue
+            shape = shapes[token]
+            if shape is None:
+                if in_paragraph:
+                    paragraphs += 1
+                in_paragraph = False
+                continue
+            
+            in_paragraph = True
+            starts_inside, inner, ends_inside = shape
+            if not self.ended_any:
+                self.ended_any = True
+                self.first_end_closed = in_sentence or starts_inside
+            if in_sentence or starts_inside:
+                sentences += 1
+            sentences += inner
+            in_sentence = ends_inside
+        
+        self.sentences = sentences
+        self.paragraphs = paragraphs
+        self.in_sentence = in_sentence
+        self.in_paragraph = in_paragraph
+    
+    def match_phrases(self, words, final=False):
+        """Count lexicon phrases (longest match first) in a run of words.
+        
+        Unless final, the last few words are held back in phrase_carry
+        because a phrase starting there may continue in the next segment.
+        """
+        phrase_lengths = self.lexicon.phrase_lengths
+        phrase_scores = self.lexicon.phrase_scores
+        limit = len(words) if final else len(words) - (self.lexicon.max_phrase_length - 1)
+        
+        i = 0
+        while i < limit:
+            for length in phrase_lengths.get(words[i], ()):
+                phrase = tuple(words[i:i + length])
+                if len(phrase) == length and phrase in phrase_scores:
+                    self.phrase_counts[phrase] += 1
+                    i += length
+                    break
+            else:
+                i += 1
+        self.phrase_carry = words[i:]
+    
+    def finish(self, analyzer):
+        """Close the last sentence and paragraph and derive per-word totals."""
+        if self.in_sentence:
+            self.sentences += 1
+        if self.in_paragraph:
+            self.paragraphs += 1
+        self.in_sentence = self.in_paragraph = False
+        if self.phrase_carry:
+            self.match_phrases(self.phrase_carry, final=True)
+        
+        lexicon = analyzer.lexicon
+        if self.sketch is None:
+            self.words = sum(self.word_counts.values())
+            self.syllables = total_syllables(self.word_counts, analyzer.count_syllables)
+            score_counts = self.scores_of(self.word_counts, lexicon)
+        else:
+            score_counts = self.score_counts
+        
+        self.set_sentiment(score_counts, lexicon)
+        if self.sketch is None:
+            self.frequencies = Counter({word: count for word, count in self.word_counts.items()
+                                        if word not in lexicon.stop_words and len(word) > 2})
+        else:
+            self.frequencies = Counter(self.sketch.heavy_hitters.counters)
+        return self
+    
+    def set_sentiment(self, score_counts, lexicon):
+        """Set positive/negative from word score counts plus matched phrases."""
+        score_counts = Counter(score_counts)
+        word_scores = lexicon.word_scores
+        # A matched phrase replaces the scores of the words inside it
+        for phrase, count in self.phrase_counts.items():
+            score_counts[lexicon.phrase_scores[phrase]] += count
+            for word in phrase:
+                if word in word_scores:
+                    score_counts[word_scores[word]] -= count
+        
+        self.positive = sum(score * count for score, count in score_counts.items() if score > 0)
+        self.negative = -sum(score * count for score, count in score_counts.items() if score < 0)
+    
+    def scores_of(self, word_counts, lexicon):
+        """Total word count per sentiment score, as a Counter of score -> count."""
+        word_scores = lexicon.word_scores
+        score_counts = Counter()
+        # Walk whichever of the text vocabulary and the lexicon is smaller
+        if len(word_scores) < len(word_counts):
+            for word, score in word_scores.items():
+                if word in word_counts:
+                    score_counts[score] += word_counts[word]
+        else:
+            for word, count in word_counts.items():
+                if word in word_scores:
+                    score_counts[word_scores[word]] += count
+        return score_counts
+    
+    def merge(self, other):
+        """Add another finished TextStats' raw totals (call finish() afterwards)."""
+        self.characters += other.characters
+        self.characters_no_spaces += other.characters_no_spaces
+        self.sentences += other.sentences
+        self.paragraphs += other.paragraphs
+        self.word_counts.update(other.word_counts)
+        self.phrase_counts.update(other.phrase_counts)
+        if other.sketch is not None:
+            if self.sketch is None:
+                self.sketch = other.sketch.empty_copy()
+            self.words += other.words
+            self.syllables += other.syllables
+            self.score_counts.update(other.score_counts)
+            self.sketch.merge(other.sketch)
+        return self
+    
+    def partial(self):
+        """Copy of the raw totals only, small enough to send between processes."""
+        copy = TextStats()
+        return copy.merge(self)
+    
+    CACHED_FIELDS = ('characters', 'characters_no_spaces', 'sentences', 'paragraphs',
+                     'words', 'syllables', 'positive', 'negative')
+    
+    def cache_record(self):
+        """The finished figures and the word and phrase tables, as a JSON-ready dict."""
+        record = {field: getattr(self, field) for field in self.CACHED_FIELDS}
+        record['word_counts'] = self.word_counts
+        record['phrase_counts'] = [[list(phrase), count] for phrase, count in self.phrase_counts.items()]
+        return record
+    
+    @classmethod
+    def from_cache_record(cls, record, lexicon):
+        """Finished stats rebuilt from cache_record(), as finish() would leave them."""
+        stats = cls(lexicon)
+        for field in cls.CACHED_FIELDS:
+            setattr(stats, field, record[field])
+        stats.word_counts = Counter(record['word_counts'])
+        stats.phrase_counts = Counter({tuple(phrase): count for phrase, count in record['phrase_counts']})
+        stats.frequencies = Counter({word: count for word, count in stats.word_counts.items()
+                                     if word not in lexicon.stop_words and len(word) > 2})
+        return stats
+
+class ResultCache:
+    """On-disk cache of finished analyses, one JSON file per content key.
+    
+    Entries are evicted least recently used first once the directory holds
+    more than max_bytes; file modification times carry recency across runs.
+    """
+    def __init__(self, directory=".text_analyzer_cache", max_bytes=64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        # key -> entry size, oldest access first
+        self.entries = {}
+        files = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in files:
+            self.entries[path.stem] = path.stat().st_size
+        self.total_bytes = sum(self.entries.values())
+    
+    def path_for(self, key):
+        return self.directory / f"{key}.json"
+    
+    def get(self, key):
+        """Cached record for key, or None."""
+        size = self.entries.pop(key, None)
+        if size is not None:
+            path = self.path_for(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    record = json.load(file)
+                os.utime(path)
+                self.entries[key] = size
+                self.hits += 1
+                return record
+            except (OSError, ValueError):
+                self.total_bytes -= size
+        self.misses += 1
+        return None
+    
+    def put(self, key, record):
+        """Store a record, then evict the least recently used entries over budget."""
+        path = self.path_for(key)
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(record, file)
+        os.replace(temp_path, path)
+        
+        self.total_bytes -= self.entries.pop(key, 0)
+        self.entries[key] = path.stat().st_size
+        self.total_bytes += self.entries[key]
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            self.total_bytes -= self.entries.pop(oldest)
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(oldest))
+            except FileNotFoundError:
+                pass
+    
+    def report(self):
+        """One-line hit/miss summary."""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0
+        return (f"💾 Cache: {self.hits} hits, {self.misses} misses ({hit_rate:.0%} hit rate), "
+                f"{len(self.entries)} entries, {self.total_bytes / 1024:,.0f} KB, "
+                f"{self.evictions} evicted")
+
+worker_lexicon = None
+worker_sketch = None
+
+def init_worker(lexicon, sketch=None):
+    """Install the shared lexicon (and sketch settings) once per worker process."""
+    global worker_lexicon, worker_sketch
+    worker_lexicon = lexicon
+    worker_sketch = sketch
+
+def analyze_document(path):
+    """Analyze one file in a worker process.
+    
+    Returns (path, summary, partial stats); on failure the summary holds
+    an 'error' message and the stats are None.
+    """
+    analyzer = TextAnalyzer(worker_lexicon, worker_sketch)
+    try:
+        stats = analyzer.analyze_file(path)
+    except (OSError, UnicodeDecodeError) as e:
+        return path, {'error': str(e)}, None
+    return path, analyzer.summary(), stats.partial()
+
 class TextAnalyzer:
-    def __init__(self):
+    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'}
+    
+    positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 'awesome', 'brilliant', 'perfect', 'love', 'like', 'happy', 'joy', 'pleased', 'satisfied', 'delighted', 'thrilled', 'excited', 'optimistic', 'positive', 'beautiful', 'successful', 'win', 'winner', 'best', 'better', 'improve', 'success', 'achievement', 'accomplish']
+    
+    negative_words = ['bad', 'terrible', 'awful', 'horrible', 'hate', 'dislike', 'angry', 'sad', 'disappointed', 'frustrated', 'annoyed', 'upset', 'worried', 'concerned', 'problem', 'issue', 'fail', 'failure', 'worst', 'worse', 'negative', 'difficult', 'hard', 'challenging', 'struggle', 'trouble', 'wrong', 'error', 'mistake', 'damage']
+    
+    def __init__(self, lexicon=None, sketch=None, cache=None):
+        self.lexicon = lexicon or default_lexicon()
+        # A FrequencySketch switches word statistics to bounded-memory approximations
+        self.sketch = sketch
+        # A ResultCache lets analyze_file skip unchanged files (exact mode only)
+        self.cache = cache
         self.text = ""
-        self.sentences = []
-        self.words = []
-        self.paragraphs = []
+        self.stats = self.new_stats()
+        self.cached_sentences = None
+        self.cached_words = None
+        self.cached_paragraphs = None
+        
+        # Per-paragraph state for apply_edit, built on the first edit: pieces
+        # and piece_stats are slots in text order, with None for unused slots
+        self.pieces = None
+        self.piece_stats = None
+        self.piece_offsets = None
+        self.sentence_chain = None
+    
+    @property
+    def text(self):
+        """The loaded text (rebuilt from its paragraphs after edits)."""
+        if self.pieces is not None:
+            return '\n\n'.join(piece for piece in self.pieces if piece is not None)
+        return self.loaded_text
+    
+    @text.setter
+    def text(self, value):
+        self.loaded_text = value
+        self.pieces = self.piece_stats = self.piece_offsets = self.sentence_chain = None
+        # Only load_text keeps the text its stats were built from
+        self.text_loaded = False
     
     def load_text(self, text):
         """Load text for analysis."""
+        self.analyze_stream([text])
         self.text = text
-        self.sentences = self.split_sentences(text)
-        self.words = self.extract_words(text)
-        self.paragraphs = self.split_paragraphs(text)
+        self.text_loaded = True
+    
+    def analyze_stream(self, chunks):
+        """Analyze text arriving in chunks without keeping it in memory."""
+        self.text = ""
+        self.cached_sentences = self.cached_words = self.cached_paragraphs = None
+        self.stats = self.new_stats()
+        
+        carry = ""
+        for chunk in chunks:
+            text = carry + chunk
+            # Cut after the last whitespace, keeping trailing newlines back
+            # so a '\n\n' paragraph break is never split between segments
+            cut = len(text)
+            while cut and not text[cut - 1].isspace():
+                cut -= 1
+            while cut and text[cut - 1] == '\n':
+                cut -= 1
+            if cut:
+                self.stats.add_segment(text[:cut])
+            carry = text[cut:]
+        
+        if carry:
+            self.stats.add_segment(carry)
+        return self.stats.finish(self)
+    
+    def analyze_file(self, filename, chunk_size=1024 * 1024):
+        """Analyze a file in chunks so memory stays flat on huge files."""
+        key = None
+        if self.cache is not None and self.sketch is None:
+            key = self.cache_key(filename, chunk_size)
+            record = self.cache.get(key)
+            if record is not None:
+                self.text = ""
+                self.cached_sentences = self.cached_words = self.cached_paragraphs = None
+                self.stats = TextStats.from_cache_record(record['stats'], self.lexicon)
+                return self.stats
+        
+        with open(filename, 'r', encoding='utf-8') as file:
+            stats = self.analyze_stream(iter(lambda: file.read(chunk_size), ''))
+        if key is not None:
+            self.cache.put(key, {'stats': stats.cache_record()})
+        return stats
+    
+    def cache_key(self, filename, chunk_size=1024 * 1024):
+        """Hash of the file's bytes plus the analyzer and lexicon versions."""
+        digest = hashlib.sha256(f"{ANALYZER_VERSION}:{self.lexicon.version}:".encode())
+        with open(filename, 'rb') as file:
+            for block in iter(lambda: file.read(chunk_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def analyze_corpus(self, paths, workers=None):
+        """Analyze many files across a process pool.
+        
+        Returns {path: summary} for every document and leaves the merged
+        corpus-wide totals in self.stats, so generate_report() covers the
+        whole corpus.
+        """
+        paths = [str(path) for path in paths]
+        corpus = self.new_stats()
+        documents = {}
+        
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(paths) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(self.lexicon, self.sketch)) as pool:
+            for path, summary, stats in pool.map(analyze_document, paths, chunksize=chunksize):
+                documents[path] = summary
+                if stats is not None:
+                    corpus.merge(stats)
+        
+        self.text = ""
+        self.cached_sentences = self.cached_words = self.cached_paragraphs = None
+        self.stats = corpus.finish(self)
+        return documents
+    
+    def summarize_piece(self, piece):
+        """Raw stats for one paragraph piece (text between '\\n\\n' breaks)."""
+        stats = TextStats(self.lexicon)
+        stats.add_segment(piece)
+        if stats.phrase_carry:
+            stats.match_phrases(stats.phrase_carry, final=True)
+        return stats
+    
+    def start_editing(self):
+        """Split the loaded text into paragraph pieces and summarize each one."""
+        if not self.text_loaded:
+            raise ValueError("Incremental edits need text loaded with load_text()")
+        if self.stats.sketch is not None:
+            raise ValueError("Incremental edits need exact (non-sketch) statistics")
+        pieces = self.loaded_text.split('\n\n')
+        self.place_pieces(pieces, [self.summarize_piece(piece) for piece in pieces])
+        # finish() derives sentiment without keeping score_counts in exact mode
+        self.stats.score_counts = self.stats.scores_of(self.stats.word_counts, self.lexicon)
+    
+    def place_pieces(self, pieces, piece_stats):
+        """Lay the pieces out in every other slot, leaving room to split paragraphs.
+        
+        piece_offsets holds len(piece) + 2 per slot (0 for unused ones), so a
+        prefix sum is where a piece starts; sentence_chain folds the pieces'
+        sentence states in text order.
+        """
+        slots = 2 * len(pieces)
+        self.pieces = [None] * slots
+        self.piece_stats = [None] * slots
+        self.pieces[::2] = pieces
+        self.piece_stats[::2] = piece_stats
+        self.piece_offsets = FenwickTree([len(piece) + 2 if piece is not None else 0
+                                          for piece in self.pieces])
+        self.sentence_chain = SegmentTree([sentence_state(stats) for stats in self.piece_stats],
+                                          chain_sentence_states, NO_PARAGRAPHS)
+    
+    def set_slot(self, slot, piece, piece_stats):
+        """Put a piece (or None) in a slot and update both trees."""
+        old = self.pieces[slot]
+        size = len(piece) + 2 if piece is not None else 0
+        self.piece_offsets.add(slot, size - (len(old) + 2 if old is not None else 0))
+        self.sentence_chain.update(slot, sentence_state(piece_stats))
+        self.pieces[slot] = piece
+        self.piece_stats[slot] = piece_stats
+    
+    def next_piece(self, slot):
+        """Slot of the piece after slot, or None after the last piece."""
+        start = self.piece_offsets.prefix(slot + 1)
+        if start >= self.piece_offsets.total:
+            return None
+        return self.piece_offsets.find(start)
+    
+    def adjust_totals(self, piece_stats, sign):
+        """Add (sign=1) or remove (sign=-1) one piece's raw stats from self.stats."""
+        stats = self.stats
+        stats.characters += sign * piece_stats.characters
+        stats.characters_no_spaces += sign * piece_stats.characters_no_spaces
+        stats.paragraphs += sign * piece_stats.in_paragraph
+        stats.words += sign * sum(piece_stats.word_counts.values())
+        stats.syllables += sign * total_syllables(piece_stats.word_counts, self.count_syllables)
+        for score, count in stats.scores_of(piece_stats.word_counts, self.lexicon).items():
+            stats.score_counts[score] += sign * count
+        
+        stop_words = self.lexicon.stop_words
+        for table, counts in ((stats.word_counts, piece_stats.word_counts),
+                              (stats.phrase_counts, piece_stats.phrase_counts)):
+            for key, count in counts.items():
+                total = table[key] + sign * count
+                if total:
+                    table[key] = total
+                else:
+                    del table[key]
+        for word, count in piece_stats.word_counts.items():
+            if word not in stop_words and len(word) > 2:
+                total = stats.frequencies[word] + sign * count
+                if total:
+                    stats.frequencies[word] = total
+                else:
+                    del stats.frequencies[word]
+    
+    def apply_edit(self, offset, deleted_length, inserted_text):
+        """Replace deleted_length characters at offset with inserted_text.
+        
+        Only the paragraphs the edit touches are re-tokenized; every total
+        is updated by removing their old stats and adding the new ones.
+        Paragraphs are found through the piece_offsets prefix sums and
+        sentences re-chained through sentence_chain, so the rest of the
+        text costs O(log P) for P paragraphs.
+        """
+        if self.pieces is None:
+            self.start_editing()
+        offsets = self.piece_offsets
+        
+        # Every piece's span includes the '\n\n' after it, the last one's too
+        end = offset + deleted_length
+        if offset < 0 or deleted_length < 0 or end > offsets.total - 2:
+            raise ValueError("Edit lies outside the text")
+        
+        first = offsets.find(offset)
+        last = offsets.find(end)
+        if end > offsets.prefix(last) + len(self.pieces[last]):
+            # The edit reaches into the break after `last`
+            last = self.next_piece(last)
+        slots = [first]
+        while slots[-1] != last:
+            slots.append(self.next_piece(slots[-1]))
+        region = '\n\n'.join(self.pieces[slot] for slot in slots)
+        local = offset - offsets.prefix(first)
+        region = region[:local] + inserted_text + region[local + deleted_length:]
+        # A trailing newline would pair up with the next break differently
+        following = self.next_piece(slots[-1])
+        while region.endswith('\n') and following is not None:
+            slots.append(following)
+            region += '\n\n' + self.pieces[following]
+            following = self.next_piece(following)
+        
+        new_pieces = region.split('\n\n')
+        new_stats = [self.summarize_piece(piece) for piece in new_pieces]
+        for slot in slots:
+            self.adjust_totals(self.piece_stats[slot], -1)
+        for piece_stats in new_stats:
+            self.adjust_totals(piece_stats, 1)
+        
+        # Account for the '\n\n' breaks that appeared or disappeared
+        breaks = 2 * (len(new_pieces) - len(slots))
+        self.stats.characters += breaks
+        self.stats.characters_no_spaces += breaks
+        
+        # The new pieces reuse the old slots and any unused ones up to the next piece
+        limit = following if following is not None else len(self.pieces)
+        if first + len(new_pieces) <= limit:
+            for slot in slots:
+                self.set_slot(slot, None, None)
+            for slot, (piece, piece_stats) in enumerate(zip(new_pieces, new_stats), first):
+                self.set_slot(slot, piece, piece_stats)
+        else:
+            # Out of room: lay every piece out afresh with gaps between them
+            replaced = set(slots)
+            pieces, piece_stats = [], []
+            for slot, piece in enumerate(self.pieces):
+                if slot == first:
+                    pieces.extend(new_pieces)
+                    piece_stats.extend(new_stats)
+                elif piece is not None and slot not in replaced:
+                    pieces.append(piece)
+                    piece_stats.append(self.piece_stats[slot])
+            self.place_pieces(pieces, piece_stats)
+        
+        added, open_after = self.sentence_chain.total()[:2]
+        self.stats.sentences = added + open_after
+        self.stats.set_sentiment(self.stats.score_counts, self.lexicon)
+        self.cached_sentences = self.cached_words = self.cached_paragraphs = None
+        return self.stats
+    
+    def new_stats(self):
+        """Empty TextStats for this analyzer's lexicon and sketch settings."""
+        sketch = self.sketch.empty_copy() if self.sketch is not None else None
+        return TextStats(self.lexicon, sketch)
+    
+    def distinct_words(self):
+        """Number of distinct words (estimated in approximate mode)."""
+        if self.stats.sketch is not None:
+            return self.stats.sketch.distinct.count()
+        return len(self.stats.word_counts)
+    
+    def word_count_estimate(self, word):
+        """Count of a single word (a Count-Min estimate in approximate mode)."""
+        word = normalize_word(word)
+        if self.stats.sketch is not None:
+            return self.stats.sketch.point_counts.estimate(word)
+        return self.stats.word_counts[word]
+    
+    def analyze_directory(self, directory, pattern="*.txt", workers=None):
+        """Analyze every file matching pattern under directory."""
+        return self.analyze_corpus(sorted(Path(directory).rglob(pattern)), workers)
+    
+    @property
+    def sentences(self):
+        """Sentences of the loaded text (split on first use)."""
+        if self.cached_sentences is None:
+            self.cached_sentences = self.split_sentences(self.text)
+        return self.cached_sentences
+    
+    @property
+    def words(self):
+        """Words of the loaded text (extracted on first use)."""
+        if self.cached_words is None:
+            self.cached_words = self.extract_words(self.text)
+        return self.cached_words
+    
+    @property
+    def paragraphs(self):
+        """Paragraphs of the loaded text (split on first use)."""
+        if self.cached_paragraphs is None:
+            self.cached_paragraphs = self.split_paragraphs(self.text)
+        return self.cached_paragraphs
     
     def split_sentences(self, text):
         """Split text into sentences."""
@@ -26,7 +1054,7 @@ class TextAnalyzer:
         """Extract words from text."""
         # Remove punctuation and convert to lowercase
         text = text.lower()
-        text = text.translate(str.maketrans('', '', string.punctuation))
+        text = text.translate(PUNCTUATION_TABLE)
         return text.split()
     
     def split_paragraphs(self, text):
@@ -36,37 +1064,60 @@ class TextAnalyzer:
     
     def basic_stats(self):
         """Get basic text statistics."""
+        stats = self.stats
         return {
-            'characters': len(self.text),
-            'characters_no_spaces': len(self.text.replace(' ', '')),
-            'words': len(self.words),
-            'sentences': len(self.sentences),
-            'paragraphs': len(self.paragraphs),
-            'avg_words_per_sentence': len(self.words) / len(self.sentences) if self.sentences else 0,
-            'avg_sentences_per_paragraph': len(self.sentences) / len(self.paragraphs) if self.paragraphs else 0
+            'characters': stats.characters,
+            'characters_no_spaces': stats.characters_no_spaces,
+            'words': stats.words,
+            'sentences': stats.sentences,
+            'paragraphs': stats.paragraphs,
+            'avg_words_per_sentence': stats.words / stats.sentences if stats.sentences else 0,
+            'avg_sentences_per_paragraph': stats.sentences / stats.paragraphs if stats.paragraphs else 0
         }
     
     def word_frequency(self, top_n=10):
         """Get word frequency analysis."""
-        if not self.words:
+        if not self.stats.words:
             return {}
         
-        # Filter out common stop words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'}
+        # Stop words and short words are filtered out while counting
+        frequencies = self.stats.frequencies
+        top = frequencies.most_common(top_n)
+        if self.pieces is None or not top:
+            return top
         
-        filtered_words = [word for word in self.words if word not in stop_words and len(word) > 2]
-        
-        counter = Counter(filtered_words)
-        return counter.most_common(top_n)
+        # Edits re-insert words out of text order; rank ties by first
+        # occurrence, as the Counter of a fresh load_text does
+        cutoff = top[-1][1]
+        tied = [(word, count) for word, count in frequencies.items() if count >= cutoff]
+        order = self.first_occurrences({word for word, _ in tied})
+        tied.sort(key=lambda item: (-item[1], order[item[0]]))
+        return tied[:top_n]
+    
+    def first_occurrences(self, words):
+        """Rank of each of words by where it first appears in the edited text."""
+        order = {}
+        remaining = set(words)
+        for piece_stats in self.piece_stats:
+            if piece_stats is None:
+                continue
+            # A piece's word_counts are in order of first occurrence
+            for word in piece_stats.word_counts:
+                if word in remaining:
+                    order[word] = len(order)
+                    remaining.discard(word)
+            if not remaining:
+                break
+        return order
     
     def readability_score(self):
         """Calculate Flesch Reading Ease score."""
-        if not self.sentences or not self.words:
+        if not self.stats.sentences or not self.stats.words:
             return 0
         
-        total_words = len(self.words)
-        total_sentences = len(self.sentences)
-        total_syllables = sum(self.count_syllables(word) for word in self.words)
+        total_words = self.stats.words
+        total_sentences = self.stats.sentences
+        total_syllables = self.stats.syllables
         
         if total_sentences == 0 or total_words == 0:
             return 0
@@ -75,26 +1126,7 @@ class TextAnalyzer:
         score = 206.835 - (1.015 * (total_words / total_sentences)) - (84.6 * (total_syllables / total_words))
         return max(0, min(100, score))
     
-    def count_syllables(self, word):
-        """Count syllables in a word (approximation)."""
-        word = word.lower()
-        count = 0
-        vowels = 'aeiouy'
-        
-        if word[0] in vowels:
-            count += 1
-        
-        for i in range(1, len(word)):
-            if word[i] in vowels and word[i-1] not in vowels:
-                count += 1
-        
-        if word.endswith('e'):
-            count -= 1
-        
-        if count == 0:
-            count = 1
-        
-        return count
+    count_syllables = staticmethod(count_word_syllables)
     
     def readability_level(self, score):
         """Get readability level description."""
@@ -115,12 +1147,8 @@ class TextAnalyzer:
     
     def sentiment_analysis(self):
         """Basic sentiment analysis."""
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 'awesome', 'brilliant', 'perfect', 'love', 'like', 'happy', 'joy', 'pleased', 'satisfied', 'delighted', 'thrilled', 'excited', 'optimistic', 'positive', 'beautiful', 'successful', 'win', 'winner', 'best', 'better', 'improve', 'success', 'achievement', 'accomplish']
-        
-        negative_words = ['bad', 'terrible', 'awful', 'horrible', 'hate', 'dislike', 'angry', 'sad', 'disappointed', 'frustrated', 'annoyed', 'upset', 'worried', 'concerned', 'problem', 'issue', 'fail', 'failure', 'worst', 'worse', 'negative', 'difficult', 'hard', 'challenging', 'struggle', 'trouble', 'wrong', 'error', 'mistake', 'damage']
-        
-        positive_count = sum(1 for word in self.words if word in positive_words)
-        negative_count = sum(1 for word in self.words if word in negative_words)
+        positive_count = self.stats.positive
+        negative_count = self.stats.negative
         
         total_sentiment_words = positive_count + negative_count
         
@@ -136,6 +1164,18 @@ class TextAnalyzer:
         else:
             return "Neutral", sentiment_score
     
+    def summary(self):
+        """Get the report figures as a dict."""
+        readability = self.readability_score()
+        sentiment, sentiment_score = self.sentiment_analysis()
+        return {
+            **self.basic_stats(),
+            'readability': readability,
+            'sentiment': sentiment,
+            'sentiment_score': sentiment_score,
+            'top_words': self.word_frequency()
+        }
+    
     def generate_report(self):
         """Generate a comprehensive text analysis report."""
         stats = self.basic_stats()
@@ -168,10 +1208,106 @@ Sentiment Score: {sentiment_score:.2f}
         for word, count in word_freq:
             report += f"\n'{word}': {count} times"
         
+        if self.stats.sketch is not None:
+            bounds = self.stats.sketch.error_bounds()
+            report += f"""
+
+📐 APPROXIMATION (~{self.stats.sketch.memory_bytes() / 1024:,.0f} KB of sketches):
+Distinct words: ~{self.distinct_words():,} (±{bounds['distinct_relative_error']:.1%})
+Top word counts may be low by up to {bounds['top_k_undercount']:,}
+Single-word estimates may be high by up to {bounds['point_overcount']:,.0f} ({bounds['point_confidence']:.0%} confidence)"""
+        
         return report
 
-def main():
+def multi_pass_stats(analyzer, text):
+    """The original multi-pass pipeline, kept as a benchmark baseline."""
+    sentences = analyzer.split_sentences(text)
+    words = analyzer.extract_words(text)
+    paragraphs = analyzer.split_paragraphs(text)
+    return {
+        'characters': len(text),
+        'characters_no_spaces': len(text.replace(' ', '')),
+        'words': len(words),
+        'sentences': len(sentences),
+        'paragraphs': len(paragraphs),
+        'syllables': sum(analyzer.count_syllables(word) for word in words),
+        'positive': sum(1 for word in words if word in analyzer.positive_words),
+        'negative': sum(1 for word in words if word in analyzer.negative_words),
+        'top_words': Counter(word for word in words
+                             if word not in analyzer.stop_words and len(word) > 2).most_common(10)
+    }
+
+def sample_text(num_words, seed=0):
+    """Build a synthetic document with sentences and paragraphs."""
+    rng = random.Random(seed)
+    vocabulary = (list(TextAnalyzer.stop_words) + TextAnalyzer.positive_words +
+                  TextAnalyzer.negative_words + [f"term{i}" for i in range(5000)])
+    parts = []
+    for i in range(1, num_words + 1):
+        parts.append(rng.choice(vocabulary))
+        if i % 12 == 0:
+            parts.append(rng.choice(['.', '!', '?']) + ('\n\n' if i % 96 == 0 else ' '))
+        else:
+            parts.append(rng.choice([' ', ' ', ', ']))
+    return ''.join(parts)
+
+def benchmark(sizes=(10000, 100000, 1000000)):
+    """Compare the fused single-pass tokenizer against the multi-pass pipeline."""
+    analyzer = TextAnalyzer()
+    print(f"\n{'words':>10}{'multi-pass':>14}{'fused':>10}{'speedup':>10}")
+    for size in sizes:
+        text = sample_text(size)
+        
+        start = time.perf_counter()
+        expected = multi_pass_stats(analyzer, text)
+        multi_pass_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        analyzer.load_text(text)
+        fused_seconds = time.perf_counter() - start
+        
+        stats = analyzer.stats
+        assert expected == {
+            'characters': stats.characters, 'characters_no_spaces': stats.characters_no_spaces,
+            'words': stats.words, 'sentences': stats.sentences, 'paragraphs': stats.paragraphs,
+            'syllables': stats.syllables, 'positive': stats.positive, 'negative': stats.negative,
+            'top_words': analyzer.word_frequency()
+        }, "fused tokenizer disagrees with the multi-pass pipeline"
+        print(f"{size:>10,}{multi_pass_seconds:>13.3f}s{fused_seconds:>9.3f}s"
+              f"{multi_pass_seconds / fused_seconds:>9.1f}x")
+    
+    benchmark_syllables()
+
+def benchmark_syllables(num_words=1000000):
+    """Compare per-token, memoized and NumPy syllable counting."""
     analyzer = TextAnalyzer()
+    words = analyzer.extract_words(sample_text(num_words))
+    word_counts = Counter(words)
+    per_token = count_word_syllables.__wrapped__
+    
+    start = time.perf_counter()
+    expected = sum(per_token(word) for word in words)
+    per_token_seconds = time.perf_counter() - start
+    
+    count_word_syllables.cache_clear()
+    start = time.perf_counter()
+    memoized = sum(count_word_syllables(word) * count for word, count in word_counts.items())
+    memoized_seconds = time.perf_counter() - start
+    assert memoized == expected, "memoized syllable count disagrees with the heuristic"
+    
+    print(f"\nSyllables over {len(words):,} words ({len(word_counts):,} distinct):")
+    print(f"per token: {per_token_seconds:.3f}s")
+    print(f"memoized:  {memoized_seconds:.3f}s")
+    if np is not None:
+        start = time.perf_counter()
+        batched = int((batch_syllables(list(word_counts)) *
+                       np.fromiter(word_counts.values(), dtype=np.int64)).sum())
+        numpy_seconds = time.perf_counter() - start
+        assert batched == expected, "NumPy syllable count disagrees with the heuristic"
+        print(f"NumPy:     {numpy_seconds:.3f}s")
+
+def main():
+    analyzer = TextAnalyzer(cache=ResultCache())
     
     print("📝 Text Analyzer")
     print("================")
@@ -180,9 +1316,11 @@ def main():
         print("\n📋 Options:")
         print("1. Analyze text input")
         print("2. Analyze text from file")
-        print("3. Exit")
+        print("3. Analyze a directory of files")
+        print("4. Load sentiment/stop-word lexicons")
+        print("5. Exit")
         
-        choice = input("\nChoose an option (1-3): ").strip()
+        choice = input("\nChoose an option (1-5): ").strip()
         
         if choice == "1":
             print("\nEnter your text (press Enter twice to finish):")
@@ -203,16 +1341,51 @@ def main():
         elif choice == "2":
             filename = input("Enter filename: ").strip()
             try:
-                with open(filename, 'r', encoding='utf-8') as file:
-                    text = file.read()
-                    analyzer.load_text(text)
-                    print(analyzer.generate_report())
+                analyzer.analyze_file(filename)
+                print(analyzer.generate_report())
+                print(analyzer.cache.report())
             except FileNotFoundError:
                 print(f"❌ File '{filename}' not found.")
             except Exception as e:
                 print(f"❌ Error reading file: {e}")
         
         elif choice == "3":
+            directory = input("Enter directory: ").strip()
+            pattern = input("File pattern (default *.txt): ").strip() or "*.txt"
+            if not os.path.isdir(directory):
+                print(f"❌ Directory '{directory}' not found.")
+                continue
+            
+            start = time.perf_counter()
+            documents = analyzer.analyze_directory(directory, pattern)
+            elapsed = time.perf_counter() - start
+            if not documents:
+                print("❌ No matching files.")
+                continue
+            
+            print(f"\n📂 {len(documents):,} documents in {elapsed:.2f}s")
+            for path, summary in documents.items():
+                if 'error' in summary:
+                    print(f"❌ {path}: {summary['error']}")
+                else:
+                    print(f"{path}: {summary['words']:,} words, "
+                          f"readability {summary['readability']:.1f}, {summary['sentiment']}")
+            print(analyzer.generate_report())
+        
+        elif choice == "4":
+            sentiment_file = input("Sentiment lexicon (word<TAB>score per line, optional): ").strip() or None
+            stop_words_file = input("Stop-word list (one per line, optional): ").strip() or None
+            try:
+                analyzer.lexicon = load_lexicon(sentiment_file, stop_words_file)
+                lexicon = analyzer.lexicon
+                print(f"✅ Loaded {len(lexicon.word_scores):,} words, {len(lexicon.phrase_scores):,} phrases "
+                      f"and {len(lexicon.stop_words):,} stop words")
+            except FileNotFoundError as e:
+                print(f"❌ File '{e.filename}' not found.")
+            except ValueError as e:
+                print(f"❌ {e}")
+        
+        elif choice == "5":
             print("👋 Happy analyzing!")
             break
         
@@ -220,4 +1393,7 @@ def main():
             print("❌ Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["benchmark"]:
+        benchmark()
+    else:
+        main()
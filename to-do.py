@@ -1,20 +1,198 @@
+import heapq
+import itertools
 import json
+import os
+import random
+import sys
+import tempfile
+import time
+from bisect import bisect_left, insort
 from datetime import datetime, timedelta
 from enum import Enum
+from functools import lru_cache
+
+from append_log import AppendLog
 
 class Priority(Enum):
     LOW = 1
     MEDIUM = 2
     HIGH = 3
 
+@lru_cache(maxsize=4096)
+def parse_day(due_date):
+    """Day number of a YYYY-MM-DD string, memoized since many todos share dates."""
+    try:
+        return datetime.strptime(due_date, '%Y-%m-%d').toordinal()
+    except ValueError:
+        return None
+
+def due_day(due_date):
+    """Parse a YYYY-MM-DD due date into a day number, or None if missing or invalid."""
+    if not due_date or not isinstance(due_date, str):
+        return None
+    return parse_day(due_date)
+
+def today_day():
+    """Today's day number, comparable with due_day()."""
+    return datetime.now().toordinal()
+
+def remove_sorted(entries, key):
+    """Remove key from a sorted list."""
+    i = bisect_left(entries, key)
+    if i < len(entries) and entries[i] == key:
+        del entries[i]
+
+def merge_offset(lists, offset):
+    """Start positions in sorted lists of distinct keys where their merge reaches offset."""
+    if offset >= sum(map(len, lists)):
+        return [len(entries) for entries in lists]
+    
+    def rank(key):
+        return sum(bisect_left(entries, key) for entries in lists)
+    
+    # The key with exactly offset smaller keys is in one of the lists
+    for entries in lists:
+        low, high = 0, len(entries)
+        while low < high:
+            middle = (low + high) // 2
+            if rank(entries[middle]) < offset:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(entries) and rank(entries[low]) == offset:
+            return [bisect_left(other, entries[low]) for other in lists]
+
+def concat_page(parts, offset, stop):
+    """Items offset..stop of (entries, length) parts read one after another."""
+    for entries, length in parts:
+        end = length if stop is None else min(stop, length)
+        for i in range(min(offset, end), end):
+            yield entries[i]
+        offset = max(0, offset - length)
+        if stop is not None:
+            stop -= length
+            if stop <= 0:
+                return
+
+def merge_page(lists, offset, stop):
+    """Items offset..stop of the merge of sorted lists of distinct keys."""
+    starts = merge_offset(lists, offset)
+    merged = heapq.merge(*(map(entries.__getitem__, range(start, len(entries)))
+                           for entries, start in zip(lists, starts)))
+    return itertools.islice(merged, None if stop is None else stop - offset)
+
+class TodoStore(AppendLog):
+    """Append-only change log of todos with periodic compaction into a snapshot."""
+    
+    def __init__(self, filename="todos", compact_every=10000):
+        super().__init__(filename, compact_every)
+    
+    def load(self):
+        """Load the snapshot and replay the log; returns (todos by id, next id)."""
+        snapshot = self.read_snapshot({'next_id': 1, 'todos': []})
+        todos = {todo['id']: todo for todo in snapshot['todos']}
+        next_id = snapshot['next_id']
+        for record in self.read_log():
+            if 'todo' in record:
+                todo = record['todo']
+                todos[todo['id']] = todo
+                next_id = max(next_id, todo['id'] + 1)
+            else:
+                todos.pop(record['deleted'], None)
+        return todos, next_id
+    
+    def append(self, record):
+        """Durably append one change: {'todo': todo} or {'deleted': id}."""
+        self.append_records([record])
+    
+    def compact(self, todos, next_id):
+        """Write a fresh snapshot and truncate the log."""
+        self.write_snapshot({'next_id': next_id, 'todos': list(todos.values())})
+
 class TodoList:
-    def __init__(self, filename="todos.json"):
+    def __init__(self, filename="todos.json", storage=None):
+        # filename is the classic JSON list; it is migrated into the store once
         self.filename = filename
-        self.todos = self.load_todos()
-        self.next_id = self.get_next_id()
+        base = filename[:-len(".json")] if filename.endswith(".json") else filename
+        self.storage = storage or TodoStore(base)
+        
+        if not self.storage.exists() and os.path.exists(filename):
+            self.todos = {todo['id']: todo for todo in self.load_todos()}
+            self.next_id = self.get_next_id()
+            self.save_todos()
+        else:
+            self.todos, self.next_id = self.storage.load()
+        self.build_indexes()
+    
+    def build_indexes(self):
+        """Build the secondary indexes from scratch.
+        
+        by_priority, pending_by_priority and completed_by_priority hold
+        (due key, id) pairs sorted in display order; pending_due holds (due day, id) for pending todos with
+        a valid due date, earliest first, and pending_due_by_priority splits it by priority.
+        pending_created and completed_created hold sorted ids (creation order) per priority.
+        Due dates are parsed once, into due_days.
+        """
+        self.due_days = {}
+        self.by_priority = {}
+        self.pending_by_priority = {}
+        self.completed_by_priority = {}
+        self.completed_ids = set()
+        self.pending_ids = set()
+        self.pending_due = []
+        self.pending_due_by_priority = {}
+        self.pending_created = {}
+        self.completed_created = {}
+        for todo in self.todos.values():
+            self.index_todo(todo, sort=False)
+        for entries in (*self.by_priority.values(), *self.pending_by_priority.values(),
+                        *self.completed_by_priority.values(), self.pending_due,
+                        *self.pending_due_by_priority.values(), *self.pending_created.values(),
+                        *self.completed_created.values()):
+            entries.sort()
+    
+    def sort_key(self, todo):
+        """Display order within a priority: due date (undated last), then id."""
+        return (todo['due_date'] or '9999-12-31', todo['id'])
+    
+    def index_todo(self, todo, sort=True):
+        """Add a todo to the secondary indexes."""
+        add = insort if sort else list.append
+        day = due_day(todo['due_date'])
+        self.due_days[todo['id']] = day
+        key = self.sort_key(todo)
+        add(self.by_priority.setdefault(todo['priority'], []), key)
+        if todo['completed']:
+            self.completed_ids.add(todo['id'])
+            add(self.completed_by_priority.setdefault(todo['priority'], []), key)
+            add(self.completed_created.setdefault(todo['priority'], []), todo['id'])
+            return
+        self.pending_ids.add(todo['id'])
+        add(self.pending_by_priority.setdefault(todo['priority'], []), key)
+        add(self.pending_created.setdefault(todo['priority'], []), todo['id'])
+        if day is not None:
+            add(self.pending_due, (day, todo['id']))
+            add(self.pending_due_by_priority.setdefault(todo['priority'], []), (day, todo['id']))
+    
+    def unindex_todo(self, todo):
+        """Remove a todo from the secondary indexes (before it changes)."""
+        day = self.due_days.pop(todo['id'])
+        key = self.sort_key(todo)
+        remove_sorted(self.by_priority[todo['priority']], key)
+        if todo['completed']:
+            self.completed_ids.discard(todo['id'])
+            remove_sorted(self.completed_by_priority[todo['priority']], key)
+            remove_sorted(self.completed_created[todo['priority']], todo['id'])
+            return
+        self.pending_ids.discard(todo['id'])
+        remove_sorted(self.pending_by_priority[todo['priority']], key)
+        remove_sorted(self.pending_created[todo['priority']], todo['id'])
+        if day is not None:
+            remove_sorted(self.pending_due, (day, todo['id']))
+            remove_sorted(self.pending_due_by_priority[todo['priority']], (day, todo['id']))
     
     def load_todos(self):
-        """Load todos from file."""
+        """Load todos from the classic JSON file."""
         try:
             with open(self.filename, 'r') as f:
                 return json.load(f)
@@ -22,15 +200,24 @@ class TodoList:
             return []
     
     def save_todos(self):
-        """Save todos to file."""
-        with open(self.filename, 'w') as f:
-            json.dump(self.todos, f, indent=2)
+        """Write every todo to a fresh snapshot."""
+        self.storage.compact(self.todos, self.next_id)
+    
+    def log_change(self, record):
+        """Persist a single change, compacting when the log grows large."""
+        self.storage.append(record)
+        if self.storage.wants_compaction(len(self.todos)):
+            self.save_todos()
+    
+    def close(self):
+        """Close the underlying store."""
+        self.storage.close()
     
     def get_next_id(self):
         """Get the next available ID."""
         if not self.todos:
             return 1
-        return max(todo['id'] for todo in self.todos) + 1
+        return max(self.todos) + 1
     
     def add_todo(self, title, description="", priority=Priority.MEDIUM, due_date=None):
         """Add a new todo item."""
@@ -45,41 +232,50 @@ class TodoList:
             'completed_at': None
         }
         
-        self.todos.append(todo)
+        self.todos[todo['id']] = todo
+        self.index_todo(todo)
         self.next_id += 1
-        self.save_todos()
+        self.log_change({'todo': todo})
         return todo['id']
     
     def complete_todo(self, todo_id):
         """Mark a todo as completed."""
-        for todo in self.todos:
-            if todo['id'] == todo_id:
-                todo['completed'] = True
-                todo['completed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                self.save_todos()
-                return True
-        return False
+        todo = self.todos.get(todo_id)
+        if todo is None:
+            return False
+        self.unindex_todo(todo)
+        todo['completed'] = True
+        todo['completed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.index_todo(todo)
+        self.log_change({'todo': todo})
+        return True
     
     def delete_todo(self, todo_id):
         """Delete a todo item."""
-        self.todos = [todo for todo in self.todos if todo['id'] != todo_id]
-        self.save_todos()
+        todo = self.todos.pop(todo_id, None)
+        if todo is None:
+            return False
+        self.unindex_todo(todo)
+        self.log_change({'deleted': todo_id})
+        return True
     
     def update_todo(self, todo_id, title=None, description=None, priority=None, due_date=None):
         """Update a todo item."""
-        for todo in self.todos:
-            if todo['id'] == todo_id:
-                if title is not None:
-                    todo['title'] = title
-                if description is not None:
-                    todo['description'] = description
-                if priority is not None:
-                    todo['priority'] = priority.value
-                if due_date is not None:
-                    todo['due_date'] = due_date
-                self.save_todos()
-                return True
-        return False
+        todo = self.todos.get(todo_id)
+        if todo is None:
+            return False
+        self.unindex_todo(todo)
+        if title is not None:
+            todo['title'] = title
+        if description is not None:
+            todo['description'] = description
+        if priority is not None:
+            todo['priority'] = priority.value
+        if due_date is not None:
+            todo['due_date'] = due_date
+        self.index_todo(todo)
+        self.log_change({'todo': todo})
+        return True
     
     def get_priority_symbol(self, priority):
         """Get symbol for priority level."""
@@ -91,64 +287,171 @@ class TodoList:
         names = {1: "Low", 2: "Medium", 3: "High"}
         return names.get(priority, "Unknown")
     
-    def is_overdue(self, due_date):
+    def is_overdue(self, due_date, today=None):
         """Check if a task is overdue."""
-        if not due_date:
-            return False
-        try:
-            due = datetime.strptime(due_date, '%Y-%m-%d')
-            return due.date() < datetime.now().date()
-        except:
+        day = due_day(due_date)
+        if day is None:
             return False
+        return day < (today if today is not None else today_day())
+    
+    def query(self, filter="pending", sort="priority", offset=0, limit=None, priority=None):
+        """Yield matching todos lazily, skipping offset and stopping after limit.
+        
+        filter is "pending", "all", "completed" or "overdue"; sort is "priority"
+        (the display order), "due" or "created". Todos are read off the sorted
+        indexes, so nothing beyond offset + limit is sorted or copied.
+        """
+        today = today_day()
+        stop = None if limit is None else offset + limit
+        if filter == "overdue" and sort == "due" and priority is None:
+            count = self.overdue_count(today)
+            for i in range(offset, count if stop is None else min(stop, count)):
+                yield self.todos[self.pending_due[i][1]]
+            return
+        
+        if filter == "overdue" and sort in ("priority", "due"):
+            # Each priority's overdue todos are a prefix of its due-date bucket
+            buckets = self.pending_due_by_priority
+            priorities = [priority.value] if priority else sorted(buckets, reverse=True)
+            parts = []
+            for value in priorities:
+                entries = buckets.get(value, [])
+                parts.append((entries, bisect_left(entries, (today,))))
+            for _, todo_id in concat_page(parts, offset, stop):
+                yield self.todos[todo_id]
+            return
+        
+        if sort not in ("priority", "due"):
+            # Creation order is id order; find where the page starts in each bucket
+            groups = {
+                "pending": [self.pending_created],
+                "all": [self.pending_created, self.completed_created],
+                "completed": [self.completed_created],
+                "overdue": [self.pending_created]
+            }[filter]
+            lists = [group[value] for group in groups for value in group
+                     if priority is None or value == priority.value]
+            if filter == "overdue":
+                # Overdue by creation has no index of its own, so filter pending ids
+                ids = (todo_id for todo_id in heapq.merge(*lists)
+                       if (self.due_days[todo_id] or today) < today)
+                ids = itertools.islice(ids, offset, stop)
+            else:
+                ids = merge_page(lists, offset, stop)
+            for todo_id in ids:
+                yield self.todos[todo_id]
+            return
+        
+        buckets = {
+            "pending": self.pending_by_priority,
+            "all": self.by_priority,
+            "completed": self.completed_by_priority
+        }[filter]
+        priorities = [priority.value] if priority else sorted(buckets, reverse=True)
+        if sort == "priority":
+            # Whole buckets before the page are skipped by their lengths
+            parts = [(entries, len(entries)) for entries in map(buckets.get, priorities) if entries]
+            entries = concat_page(parts, offset, stop)
+        else:
+            # Find where the page starts in each bucket, then merge from there
+            entries = merge_page([buckets.get(value, []) for value in priorities], offset, stop)
+        for _, todo_id in entries:
+            yield self.todos[todo_id]
+    
+    def count(self, filter="pending", priority=None):
+        """Number of todos a query with this filter would return."""
+        if priority is None:
+            return {
+                "pending": len(self.pending_ids),
+                "all": len(self.todos),
+                "completed": len(self.completed_ids),
+                "overdue": self.overdue_count()
+            }[filter]
+        if filter == "overdue":
+            entries = self.pending_due_by_priority.get(priority.value, [])
+            return bisect_left(entries, (today_day(),))
+        buckets = {
+            "pending": self.pending_by_priority,
+            "all": self.by_priority,
+            "completed": self.completed_by_priority
+        }[filter]
+        return len(buckets.get(priority.value, ()))
+    
+    def overdue_count(self, today=None):
+        """Number of pending todos past their due date, by one bisect."""
+        return bisect_left(self.pending_due, (today if today is not None else today_day(),))
+    
+    def overdue_todos(self, today=None):
+        """Pending todos past their due date, earliest first."""
+        count = self.overdue_count(today)
+        return [self.todos[todo_id] for _, todo_id in self.pending_due[:count]]
+    
+    def format_todo(self, todo, today):
+        """Format one todo as display lines."""
+        status = "✅" if todo['completed'] else "⬜"
+        priority_symbol = self.get_priority_symbol(todo['priority'])
+        lines = [f"\n{status} [{todo['id']}] {priority_symbol} {todo['title']}"]
+        
+        if todo['description']:
+            lines.append(f"   📝 {todo['description']}")
+        
+        if todo['due_date']:
+            due_date = todo['due_date']
+            day = self.due_days[todo['id']]
+            if day is not None and day < today and not todo['completed']:
+                lines.append(f"   ⏰ Due: {due_date} (OVERDUE)")
+            else:
+                lines.append(f"   📅 Due: {due_date}")
+        
+        lines.append(f"   🏷️  Priority: {self.get_priority_name(todo['priority'])}")
+        
+        if todo['completed']:
+            lines.append(f"   ✅ Completed: {todo['completed_at']}")
+        return "\n".join(lines)
+    
+    def render_todos(self, todos, out=None, page_size=1000):
+        """Write todos with one buffered write per page; returns how many were written."""
+        out = out or sys.stdout
+        today = today_day()
+        written = 0
+        while True:
+            page = [self.format_todo(todo, today) for todo in itertools.islice(todos, page_size)]
+            if not page:
+                return written
+            out.write("\n".join(page) + "\n")
+            written += len(page)
     
     def display_todos(self, show_completed=False, filter_priority=None):
         """Display todos with formatting."""
-        filtered_todos = []
-        
-        for todo in self.todos:
-            if not show_completed and todo['completed']:
-                continue
-            if filter_priority and todo['priority'] != filter_priority.value:
-                continue
-            filtered_todos.append(todo)
+        todos = self.query("all" if show_completed else "pending", priority=filter_priority)
+        first = next(todos, None)
         
-        if not filtered_todos:
+        if first is None:
             print("No todos found.")
             return
         
-        filtered_todos.sort(key=lambda x: (
-            -x['priority'], 
-            x['due_date'] or '9999-12-31'  
-        ))
-        
         print("\n=== Your To-Do List ===")
-        for todo in filtered_todos:
-            status = "✅" if todo['completed'] else "⬜"
-            priority_symbol = self.get_priority_symbol(todo['priority'])
-            
-            print(f"\n{status} [{todo['id']}] {priority_symbol} {todo['title']}")
-            
-            if todo['description']:
-                print(f"   📝 {todo['description']}")
-            
-            if todo['due_date']:
-                due_date = todo['due_date']
-                if self.is_overdue(due_date) and not todo['completed']:
-                    print(f"   ⏰ Due: {due_date} (OVERDUE)")
-                else:
-                    print(f"   📅 Due: {due_date}")
-            
-            print(f"   🏷️  Priority: {self.get_priority_name(todo['priority'])}")
-            
-            if todo['completed']:
-                print(f"   ✅ Completed: {todo['completed_at']}")
+        self.render_todos(itertools.chain([first], todos))
+    
+    def display_page(self, page, page_size=20, filter="pending", sort="priority", priority=None):
+        """Display page N (from 1) of a query."""
+        total = self.count(filter, priority)
+        pages = max(1, -(-total // page_size))
+        if not 1 <= page <= pages:
+            print(f"❌ Page must be between 1 and {pages}.")
+            return
+        
+        print(f"\n=== Your To-Do List (page {page} of {pages}, {total:,} todos) ===")
+        todos = self.query(filter, sort, (page - 1) * page_size, page_size, priority)
+        if not self.render_todos(todos):
+            print("No todos found.")
     
     def get_stats(self):
         """Get todo statistics."""
         total = len(self.todos)
-        completed = len([t for t in self.todos if t['completed']])
-        pending = total - completed
-        overdue = len([t for t in self.todos if self.is_overdue(t['due_date']) and not t['completed']])
+        completed = len(self.completed_ids)
+        pending = len(self.pending_ids)
+        overdue = self.overdue_count()
         
         return {
             'total': total,
@@ -159,6 +462,76 @@ class TodoList:
         }
 
 
+def legacy_stats(todos):
+    """The original per-todo stats scan, kept as a benchmark baseline."""
+    def is_overdue(due_date):
+        if not due_date:
+            return False
+        try:
+            due = datetime.strptime(due_date, '%Y-%m-%d')
+            return due.date() < datetime.now().date()
+        except:
+            return False
+    
+    total = len(todos)
+    completed = len([t for t in todos if t['completed']])
+    pending = total - completed
+    overdue = len([t for t in todos if is_overdue(t['due_date']) and not t['completed']])
+    return {
+        'total': total,
+        'completed': completed,
+        'pending': pending,
+        'overdue': overdue,
+        'completion_rate': (completed / total * 100) if total > 0 else 0
+    }
+
+def sample_todos(num_todos, seed=0):
+    """Random todos due within two months either side of today."""
+    rng = random.Random(seed)
+    today = datetime.now()
+    todos = {}
+    for todo_id in range(1, num_todos + 1):
+        due = today + timedelta(days=rng.randint(-60, 60))
+        completed = rng.random() < 0.3
+        todos[todo_id] = {
+            'id': todo_id,
+            'title': f"Task {todo_id}",
+            'description': "",
+            'priority': rng.randint(1, 3),
+            'due_date': due.strftime('%Y-%m-%d') if rng.random() < 0.7 else None,
+            'completed': completed,
+            'created_at': today.strftime('%Y-%m-%d %H:%M:%S'),
+            'completed_at': today.strftime('%Y-%m-%d %H:%M:%S') if completed else None
+        }
+    return todos
+
+def benchmark(num_todos=500000):
+    """Compare the original stats scan against the indexed stats view."""
+    todos = sample_todos(num_todos)
+    with tempfile.TemporaryDirectory() as directory:
+        todo_list = TodoList(os.path.join(directory, "todos.json"))
+        todo_list.todos = todos
+        todo_list.next_id = num_todos + 1
+        
+        start = time.perf_counter()
+        todo_list.build_indexes()
+        build_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        expected = legacy_stats(list(todos.values()))
+        legacy_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        stats = todo_list.get_stats()
+        indexed_seconds = time.perf_counter() - start
+        todo_list.close()
+    
+    assert stats == expected, "indexed stats disagree with the full scan"
+    print(f"\n📊 Stats view on {num_todos:,} todos:")
+    print(f"Full scan with strptime: {legacy_seconds:.3f}s")
+    print(f"Indexed (one bisect):    {indexed_seconds * 1000:.3f}ms ({legacy_seconds / indexed_seconds:,.0f}x)")
+    print(f"One-time index build:    {build_seconds:.3f}s")
+
 def main():
     todo_list = TodoList()
     
@@ -174,9 +547,10 @@ def main():
         print("5. Delete todo")
         print("6. View statistics")
         print("7. View completed todos")
-        print("8. Exit")
+        print("8. View a page of todos")
+        print("9. Exit")
         
-        choice = input("\nChoose an option (1-8): ").strip()
+        choice = input("\nChoose an option (1-9): ").strip()
         
         if choice == "1":
             title = input("Enter todo title: ").strip()
@@ -249,8 +623,10 @@ def main():
                 todo_id = int(input("Enter todo ID to delete: "))
                 confirm = input("Are you sure? (y/n): ").lower()
                 if confirm == 'y':
-                    todo_list.delete_todo(todo_id)
-                    print("✅ Todo deleted!")
+                    if todo_list.delete_todo(todo_id):
+                        print("✅ Todo deleted!")
+                    else:
+                        print("❌ Todo not found.")
                 else:
                     print("❌ Deletion cancelled.")
             except ValueError:
@@ -269,6 +645,21 @@ def main():
             todo_list.display_todos(show_completed=True)
         
         elif choice == "8":
+            print("Filters: pending, all, completed, overdue")
+            query_filter = input("Filter (default pending): ").strip().lower() or "pending"
+            print("Sort by: priority, due, created")
+            sort = input("Sort (default priority): ").strip().lower() or "priority"
+            if query_filter not in ("pending", "all", "completed", "overdue") or sort not in ("priority", "due", "created"):
+                print("❌ Invalid filter or sort.")
+                continue
+            try:
+                page = int(input("Page number (default 1): ") or "1")
+                todo_list.display_page(page, filter=query_filter, sort=sort)
+            except ValueError:
+                print("❌ Invalid page number.")
+        
+        elif choice == "9":
+            todo_list.close()
             print("👋 Stay productive!")
             break
         
@@ -276,4 +667,7 @@ def main():
             print("❌ Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["benchmark"]:
+        benchmark()
+    else:
+        main()
@@ -1,27 +1,697 @@
+import asyncio
+import atexit
 import hashlib
+import itertools
 import json
+import os
 import random
+import shelve
 import string
-from urllib.parse import urlparse
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import MutableMapping
+from datetime import datetime
+from urllib.parse import urlparse, urlunparse
+
+from append_log import AppendLog
+
+try:
+    import fcntl
+except ImportError:  # Windows: leases are only safe within one process
+    fcntl = None
+
+class JSONStorage:
+    """Keep every URL in one JSON file, rewritten on each save."""
+    incremental = False
+    
+    def __init__(self, filename="urls.json"):
+        self.filename = filename
+    
+    def load(self):
+        """Load all URLs from the JSON file."""
+        try:
+            with open(self.filename, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+    
+    def save(self, urls, changed_codes=None):
+        """Rewrite the whole JSON file."""
+        with open(self.filename, 'w') as f:
+            json.dump(urls, f, indent=2)
+    
+    def load_index(self):
+        """No persistent URL index; URLShortener builds one in memory."""
+        return None
+    
+    def wants_compaction(self, live_urls):
+        """Plain JSON storage never needs compacting."""
+        return False
+    
+    def sync(self):
+        """Every save already rewrites the file."""
+        pass
+    
+    def close(self):
+        """Nothing to release for plain JSON storage."""
+        pass
+
+class LogStorage(AppendLog):
+    """Append-only write-ahead log with periodic compaction into a snapshot."""
+    incremental = True
+    
+    def __init__(self, filename="urls", compact_every=10000):
+        super().__init__(filename, compact_every)
+    
+    def load(self):
+        """Load the snapshot and replay the log on top of it."""
+        urls = self.read_snapshot({})
+        for record in self.read_log():
+            urls[record['code']] = record['data']
+        return urls
+    
+    def load_index(self):
+        """No persistent URL index; URLShortener builds one in memory."""
+        return None
+    
+    def save(self, urls, changed_codes=None):
+        """Append changed entries to the log, or compact if none are given.
+        
+        With changed_codes, urls only needs to hold those codes.
+        """
+        if changed_codes is None:
+            self.compact(urls)
+            return
+        self.append_records([{'code': code, 'data': urls[code]} for code in changed_codes])
+    
+    def sync(self):
+        """Every append is already fsynced."""
+        pass
+    
+    def compact(self, urls):
+        """Write a fresh snapshot and truncate the log."""
+        self.write_snapshot(urls)
+
+class ShelfStorage:
+    """Keep URLs in an on-disk dbm shelf so only cached entries live in RAM."""
+    incremental = True
+    
+    def __init__(self, filename="urls.db"):
+        self.filename = filename
+        self.index_file = f"{filename}.index"
+        self.shelf = None
+        self.index = None
+    
+    def load(self):
+        """Open the shelf; URLShortener uses it directly as its URL table."""
+        self.shelf = shelve.open(self.filename)
+        return self.shelf
+    
+    def load_index(self):
+        """Open a second shelf mapping normalized long URLs to codes.
+        
+        Keeping the reverse index on disk too means RAM use doesn't grow with
+        the number of stored URLs.
+        """
+        self.index = shelve.open(self.index_file)
+        return self.index
+    
+    def save(self, urls, changed_codes=None):
+        """Write entries back into the shelf (made durable by the next sync)."""
+        for code in (urls if changed_codes is None else changed_codes):
+            self.shelf[code] = urls[code]
+    
+    def wants_compaction(self, live_urls):
+        """dbm files are updated in place, so there is nothing to compact."""
+        return False
+    
+    def sync(self):
+        """Flush the shelf and the index to disk.
+        
+        dbm.dumb (the fallback when no gdbm/ndbm is built in) rewrites its
+        whole key directory on every sync, so this runs once per click flush
+        rather than on every save.
+        """
+        self.shelf.sync()
+        if self.index is not None:
+            self.index.sync()
+    
+    def close(self):
+        """Close the shelf and the index."""
+        if self.shelf is not None:
+            self.shelf.close()
+            self.shelf = None
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+class CompactURLTable(MutableMapping):
+    """Columnar, dict-compatible URL table.
+    
+    Instead of one dict per entry, each field lives in its own column:
+    scheme://host prefixes are interned and referenced by number, clicks
+    and created_at are packed into arrays, and click_history becomes one
+    small array per clicked row of (interned bucket id, count) pairs.
+    Anything else is kept in a sparse side table. Lookups return a fresh
+    dict, so changes must be stored back with table[code] = data.
+    """
+    # History entries pack the bucket id above a 40-bit click count
+    count_bits = 40
+    count_mask = (1 << count_bits) - 1
+    
+    def __init__(self, urls=None):
+        self.rows = {}
+        self.codes = []
+        self.prefixes = []
+        self.prefix_ids = {}
+        self.url_prefixes = array('I')
+        self.url_paths = []
+        self.clicks = array('Q')
+        self.created_at = array('q')
+        self.histories = []
+        self.buckets = []
+        self.bucket_ids = {}
+        self.extra = {}
+        if urls:
+            self.update(urls)
+    
+    def split_url(self, url):
+        """Split a URL into an interned scheme://host prefix id and the rest."""
+        host_start = url.find("://") + 3 if "://" in url else 0
+        path_start = url.find("/", host_start)
+        if path_start == -1:
+            path_start = len(url)
+        
+        prefix = url[:path_start]
+        prefix_id = self.prefix_ids.get(prefix)
+        if prefix_id is None:
+            prefix_id = self.prefix_ids[prefix] = len(self.prefixes)
+            self.prefixes.append(prefix)
+        return prefix_id, url[path_start:]
+    
+    def pack_history(self, history):
+        """Pack a {bucket: clicks} dict into an array, or None if it won't fit."""
+        packed = array('Q')
+        for bucket, clicks in history.items():
+            if not isinstance(clicks, int) or not 0 <= clicks <= self.count_mask:
+                return None
+            bucket_id = self.bucket_ids.get(bucket)
+            if bucket_id is None:
+                bucket_id = self.bucket_ids[bucket] = len(self.buckets)
+                self.buckets.append(bucket)
+            packed.append(bucket_id << self.count_bits | clicks)
+        return packed
+    
+    def __getitem__(self, code):
+        row = self.rows[code]
+        data = {
+            'long_url': self.prefixes[self.url_prefixes[row]] + self.url_paths[row],
+            'clicks': self.clicks[row],
+            'created_at': str(self.created_at[row])
+        }
+        history = self.histories[row]
+        if history is not None:
+            data['click_history'] = {self.buckets[entry >> self.count_bits]: entry & self.count_mask
+                                     for entry in history}
+        data.update(self.extra.get(row, {}))
+        return data
+    
+    def __setitem__(self, code, data):
+        row = self.rows.get(code)
+        if row is None:
+            row = self.rows[code] = len(self.codes)
+            self.codes.append(code)
+            self.url_prefixes.append(0)
+            self.url_paths.append("")
+            self.clicks.append(0)
+            self.created_at.append(0)
+            self.histories.append(None)
+        
+        self.url_prefixes[row], self.url_paths[row] = self.split_url(data['long_url'])
+        self.clicks[row] = data['clicks']
+        extra = {key: value for key, value in data.items()
+                 if key not in ('long_url', 'clicks', 'created_at')}
+        
+        history = extra.pop('click_history', None)
+        packed = self.pack_history(history) if isinstance(history, dict) else None
+        self.histories[row] = packed
+        if history is not None and packed is None:
+            extra['click_history'] = history
+        
+        # created_at is normally str(int); keep anything else as-is
+        created_at = data.get('created_at', "0")
+        try:
+            self.created_at[row] = int(created_at)
+            if str(self.created_at[row]) != created_at:
+                raise ValueError
+        except (ValueError, TypeError, OverflowError):
+            self.created_at[row] = 0
+            extra['created_at'] = created_at
+        
+        if extra:
+            self.extra[row] = extra
+        else:
+            self.extra.pop(row, None)
+    
+    def __delitem__(self, code):
+        # The row stays behind as a hole; only the code mapping goes away
+        row = self.rows.pop(code)
+        self.codes[row] = None
+        self.url_paths[row] = ""
+        self.histories[row] = None
+        self.extra.pop(row, None)
+    
+    def __contains__(self, code):
+        return code in self.rows
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def __len__(self):
+        return len(self.rows)
+
+class LRUCache:
+    """Evict the least recently used entry."""
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.on_evict = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """Return a cached value (or None) and count the hit or miss."""
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        return None
+    
+    def peek(self, key):
+        """Return a cached value without touching recency or counters."""
+        return self.entries.get(key)
+    
+    def put(self, key, value):
+        """Insert a value, evicting the oldest entry when full."""
+        if key in self.entries:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            return
+        if len(self.entries) >= self.capacity:
+            self.evict(*self.entries.popitem(last=False))
+        self.entries[key] = value
+    
+    def evict(self, key, value):
+        """Count an eviction and hand the entry to on_evict."""
+        self.evictions += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def stats(self):
+        """Get hit, miss and eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            'policy': type(self).__name__,
+            'capacity': self.capacity,
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0
+        }
+
+class LFUCache(LRUCache):
+    """Evict the least frequently used entry (oldest first on ties), in O(1)."""
+    def __init__(self, capacity=10000):
+        super().__init__(capacity)
+        self.frequencies = {}
+        self.buckets = defaultdict(OrderedDict)
+        self.min_frequency = 0
+    
+    def touch(self, key):
+        """Move a key up to the next frequency bucket."""
+        frequency = self.frequencies[key]
+        del self.buckets[frequency][key]
+        if not self.buckets[frequency]:
+            del self.buckets[frequency]
+            if self.min_frequency == frequency:
+                self.min_frequency += 1
+        self.frequencies[key] = frequency + 1
+        self.buckets[frequency + 1][key] = None
+    
+    def get(self, key):
+        """Return a cached value (or None) and count the hit or miss."""
+        if key in self.entries:
+            self.hits += 1
+            self.touch(key)
+            return self.entries[key]
+        self.misses += 1
+        return None
+    
+    def put(self, key, value):
+        """Insert a value, evicting the least frequently used entry when full."""
+        if key in self.entries:
+            self.entries[key] = value
+            self.touch(key)
+            return
+        if len(self.entries) >= self.capacity:
+            bucket = self.buckets[self.min_frequency]
+            victim, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.buckets[self.min_frequency]
+            del self.frequencies[victim]
+            self.evict(victim, self.entries.pop(victim))
+        self.entries[key] = value
+        self.frequencies[key] = 1
+        self.buckets[1][key] = None
+        self.min_frequency = 1
+
+class TinyLFUCache(LRUCache):
+    """LRU cache with a TinyLFU admission filter.
+    
+    A small count-min sketch estimates how often each key was requested.
+    When the cache is full, a new key only replaces the LRU victim if it
+    has been requested more often, so one-off lookups can't flush hot codes.
+    """
+    def __init__(self, capacity=10000, depth=4):
+        super().__init__(capacity)
+        self.width = max(64, capacity * 4)
+        self.depth = depth
+        self.sketch = [[0] * self.width for _ in range(depth)]
+        self.sample_size = capacity * 10
+        self.samples = 0
+    
+    def record(self, key):
+        """Count one request for key, halving all counters periodically."""
+        for row in range(self.depth):
+            self.sketch[row][hash((row, key)) % self.width] += 1
+        self.samples += 1
+        if self.samples >= self.sample_size:
+            # Aging keeps the sketch tracking the current popularity
+            self.sketch = [[count // 2 for count in row] for row in self.sketch]
+            self.samples //= 2
+    
+    def estimate(self, key):
+        """Estimate how often key was requested."""
+        return min(self.sketch[row][hash((row, key)) % self.width] for row in range(self.depth))
+    
+    def get(self, key):
+        """Return a cached value (or None) and count the hit or miss."""
+        self.record(key)
+        return super().get(key)
+    
+    def put(self, key, value):
+        """Insert a value if it is requested more often than the LRU victim."""
+        if key not in self.entries and len(self.entries) >= self.capacity:
+            victim = next(iter(self.entries))
+            if self.estimate(key) <= self.estimate(victim):
+                return
+        super().put(key, value)
+
+CACHE_POLICIES = {'lru': LRUCache, 'lfu': LFUCache, 'tinylfu': TinyLFUCache}
+
+class CodeGenerator:
+    """Mint base62 short codes from a monotonic counter.
+    
+    Each generator leases a block of lease_size IDs from a shared counter
+    file, so several workers or processes can mint codes concurrently
+    without ever producing the same code. With scramble=True the IDs go
+    through a keyed Feistel permutation first, so consecutive codes don't
+    look consecutive. IDs left in a lease when a process exits are skipped.
+    """
+    alphabet = string.digits + string.ascii_letters
+    
+    def __init__(self, counter_file="urls.counter", lease_size=1000, scramble=True, length=6):
+        self.counter_file = counter_file
+        self.lease_size = lease_size
+        self.scramble = scramble
+        self.length = length
+        self.domain = len(self.alphabet) ** length
+        self.half_bits = ((self.domain - 1).bit_length() + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.lease_end = 0
+        self.key = None
+    
+    def lease(self):
+        """Reserve the next block of IDs from the counter file.
+        
+        The new state is written to a temp file and renamed over the counter,
+        so a crash mid-write can't leave it empty and restart IDs at zero.
+        The flock is on a separate lock file because the rename replaces the
+        counter file itself.
+        """
+        with open(f"{self.counter_file}.lock", 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.counter_file, 'r') as f:
+                    state = json.load(f)
+            except FileNotFoundError:
+                state = {'next_id': 0, 'scramble_key': os.urandom(16).hex()}
+            
+            start = state['next_id']
+            state['next_id'] = start + self.lease_size
+            temp_file = f"{self.counter_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.counter_file)
+        
+        self.key = bytes.fromhex(state['scramble_key'])
+        self.next_id = start
+        self.lease_end = start + self.lease_size
+    
+    def round_function(self, value, round_number):
+        """Keyed pseudo-random function for one Feistel round."""
+        digest = hashlib.blake2b(value.to_bytes(8, 'big'), digest_size=8,
+                                 key=self.key, salt=round_number.to_bytes(16, 'big')).digest()
+        return int.from_bytes(digest, 'big') & self.half_mask
+    
+    def permute(self, number):
+        """Map number to a unique number below self.domain."""
+        # Cycle-walk until the Feistel output lands inside the domain
+        while True:
+            left, right = number >> self.half_bits, number & self.half_mask
+            for round_number in range(4):
+                left, right = right, left ^ self.round_function(right, round_number)
+            number = (left << self.half_bits) | right
+            if number < self.domain:
+                return number
+    
+    def encode(self, number, length=0):
+        """Encode a number in base62, left-padded to length."""
+        base = len(self.alphabet)
+        characters = []
+        while number:
+            number, remainder = divmod(number, base)
+            characters.append(self.alphabet[remainder])
+        return ''.join(reversed(characters)).rjust(length, self.alphabet[0])
+    
+    def next_code(self):
+        """Get the next unused short code."""
+        with self.lock:
+            if self.next_id >= self.lease_end:
+                self.lease()
+            number = self.next_id
+            self.next_id += 1
+        
+        if number >= self.domain:
+            # Out of fixed-length codes: longer codes can't clash with them
+            return self.encode(number)
+        if self.scramble:
+            number = self.permute(number)
+        return self.encode(number, self.length)
 
 class URLShortener:
-    def __init__(self, storage_file="urls.json"):
+    def __init__(self, storage_file="urls.json", storage=None,
+                 flush_interval=5, flush_threshold=100, bucket_seconds=3600,
+                 cache=None, code_generator=None, compact=False):
         self.storage_file = storage_file
+        self.storage = storage or JSONStorage(storage_file)
         self.urls = self.load_urls()
+        if compact and isinstance(self.urls, dict):
+            self.urls = CompactURLTable(self.urls)
+        self.url_index = self.build_url_index()
         self.base_url = "https://short.ly/"
+        self.code_generator = code_generator
+        
+        # Optional hot-code cache in front of lookups
+        self.cache = cache
+        if cache is not None:
+            cache.on_evict = self.write_back
+        # Codes whose cached copy is newer than the (copying) table's entry
+        self.dirty_codes = set()
+        
+        # Clicks are counted in memory and persisted in batches
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pending_clicks = Counter()
+        self.pending_total = 0
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.bucket_seconds = bucket_seconds
+        self.flush_wakeup = threading.Event()
+        self.stop_flushing = threading.Event()
+        self.flush_thread = None
+        if flush_interval:
+            self.flush_thread = threading.Thread(target=self.flush_loop, daemon=True)
+            self.flush_thread.start()
+        self.closed = False
+        atexit.register(self.close)
     
     def load_urls(self):
-        """Load URLs from storage file."""
-        try:
-            with open(self.storage_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        """Load URLs from storage."""
+        return self.storage.load()
+    
+    def get_record(self, code):
+        """Look up a URL entry through the cache (call with self.lock held)."""
+        if self.cache is None:
+            return self.urls.get(code)
+        
+        data = self.cache.get(code)
+        if data is None:
+            data = self.urls.get(code)
+            if data is not None:
+                self.cache.put(code, data)
+        return data
+    
+    def write_back(self, code, data):
+        """Store an entry evicted from the cache if its clicks aren't in the table yet."""
+        if code in self.dirty_codes or code in self.pending_clicks:
+            self.dirty_codes.discard(code)
+            self.urls[code] = data
+    
+    def copy_record(self, code):
+        """Copy a URL entry so it can be written without holding the lock."""
+        data = self.cache.peek(code) if self.cache is not None else None
+        data = dict(data if data is not None else self.urls[code])
+        if 'click_history' in data:
+            data['click_history'] = dict(data['click_history'])
+        return data
+    
+    def save_urls(self, changed_codes=None):
+        """Save URLs to storage (only the changed codes when given)."""
+        # write_lock spans copy and write so saves land in the order they were
+        # copied; the lookup lock is only held for the copy
+        with self.write_lock:
+            with self.lock:
+                if changed_codes is not None and self.storage.incremental:
+                    records = {code: self.copy_record(code) for code in changed_codes}
+                else:
+                    records = {code: self.copy_record(code) for code in self.urls}
+            self.storage.save(records, changed_codes)
+            compaction_due = self.storage.wants_compaction(len(self.urls))
+        
+        if compaction_due:
+            self.save_urls()
+    
+    def flush_clicks(self):
+        """Persist buffered click counts and sync the storage."""
+        with self.lock:
+            codes = list(self.pending_clicks)
+            self.pending_clicks.clear()
+            self.pending_total = 0
+        if codes:
+            self.save_urls(codes)
+        # Shelves are also written under self.lock, so hold both while syncing
+        with self.write_lock:
+            with self.lock:
+                self.storage.sync()
+        return len(codes)
     
-    def save_urls(self):
-        """Save URLs to storage file."""
-        with open(self.storage_file, 'w') as f:
-            json.dump(self.urls, f, indent=2)
+    def flush_loop(self):
+        """Flush clicks every flush_interval seconds or when woken early."""
+        while not self.stop_flushing.is_set():
+            self.flush_wakeup.wait(self.flush_interval)
+            self.flush_wakeup.clear()
+            self.flush_clicks()
+    
+    def import_json(self, filename):
+        """Import URLs from a JSON file in the classic urls.json format."""
+        with open(filename, 'r') as f:
+            imported = json.load(f)
+        
+        with self.lock:
+            for code, data in imported.items():
+                # Unindex the URL the code pointed at before it is overwritten
+                previous = self.urls.get(code)
+                if previous is not None:
+                    previous_url = self.normalize_url(previous['long_url'])
+                    if self.url_index.get(previous_url) == code:
+                        del self.url_index[previous_url]
+                
+                self.urls[code] = data
+                # A cached copy would shadow the import and be flushed over it
+                if self.cache is not None and self.cache.peek(code) is not None:
+                    self.cache.put(code, data)
+                self.dirty_codes.discard(code)
+                self.url_index[self.normalize_url(data['long_url'])] = code
+        self.save_urls()
+        return len(imported)
+    
+    def export_json(self, filename):
+        """Export all URLs to a JSON file in the classic urls.json format."""
+        with self.lock:
+            urls = {code: self.copy_record(code) for code in self.urls}
+        with open(filename, 'w') as f:
+            json.dump(urls, f, indent=2)
+        return len(urls)
+    
+    def close(self):
+        """Flush pending clicks and release the storage backend."""
+        if self.closed:
+            return
+        self.closed = True
+        
+        if self.flush_thread is not None:
+            self.stop_flushing.set()
+            self.flush_wakeup.set()
+            self.flush_thread.join()
+        self.flush_clicks()
+        self.storage.close()
+    
+    def build_url_index(self):
+        """Load or build the normalized long URL -> short code index."""
+        index = self.storage.load_index()
+        if index is None:
+            index = {}
+        elif len(index) or not self.urls:
+            # A persistent index is kept current by store_url
+            return index
+        for code, data in self.urls.items():
+            index.setdefault(self.normalize_url(data['long_url']), code)
+        return index
+    
+    def normalize_url(self, url):
+        """Normalize a URL so equivalent URLs map to the same key."""
+        result = urlparse(url.strip())
+        scheme = result.scheme.lower()
+        netloc = result.netloc.lower()
+        default_ports = {'http': ':80', 'https': ':443'}
+        if scheme in default_ports and netloc.endswith(default_ports[scheme]):
+            netloc = netloc[:-len(default_ports[scheme])]
+        path = result.path or '/'
+        # Fragments never reach the server, so they don't make a URL different
+        return urlunparse((scheme, netloc, path, result.params, result.query, ''))
+    
+    def extract_code(self, short_url):
+        """Get the short code from a short URL or bare code."""
+        if short_url.startswith(self.base_url):
+            return short_url[len(self.base_url):]
+        return short_url
     
     def validate_url(self, url):
         """Validate if URL is properly formatted."""
@@ -32,7 +702,9 @@ class URLShortener:
             return False
     
     def generate_short_code(self, length=6):
-        """Generate a random short code."""
+        """Generate a short code (counter-based when a code generator is set)."""
+        if self.code_generator is not None:
+            return self.code_generator.next_code()
         characters = string.ascii_letters + string.digits
         return ''.join(random.choice(characters) for _ in range(length))
     
@@ -45,61 +717,148 @@ class URLShortener:
         if not self.validate_url(long_url):
             return None, "Invalid URL format"
         
-        # Check if URL is already shortened
-        for code, data in self.urls.items():
-            if data['long_url'] == long_url:
-                return f"{self.base_url}{code}", "URL already exists"
-        
-        # Generate short code
-        if custom_code:
-            if custom_code in self.urls:
-                return None, "Custom code already exists"
-            short_code = custom_code
-        elif use_hash:
-            short_code = self.generate_hash_code(long_url)
-            if short_code in self.urls:
-                short_code = self.generate_short_code()
-        else:
+        normalized_url = self.normalize_url(long_url)
+        # Check, pick a code and insert in one locked step, so concurrent
+        # requests for the same URL (or custom code) can't both insert
+        with self.lock:
+            # Check if URL is already shortened
+            if normalized_url in self.url_index:
+                return f"{self.base_url}{self.url_index[normalized_url]}", "URL already exists"
+            
+            # Generate short code
+            if custom_code:
+                if custom_code in self.urls:
+                    return None, "Custom code already exists"
+                short_code = custom_code
+            elif use_hash:
+                short_code = self.generate_hash_code(long_url)
+                if short_code in self.urls:
+                    short_code = self.new_short_code()
+            else:
+                short_code = self.new_short_code()
+            
+            self.store_url(short_code, long_url, normalized_url)
+        self.save_urls([short_code])
+        return f"{self.base_url}{short_code}", "Success"
+    
+    def new_short_code(self):
+        """Generate a short code that is not in use yet."""
+        short_code = self.generate_short_code()
+        # Counter codes never repeat; this only skips custom or legacy codes
+        while short_code in self.urls:
             short_code = self.generate_short_code()
-            while short_code in self.urls:
-                short_code = self.generate_short_code()
-        
-        # Store URL
+        return short_code
+    
+    def store_url(self, short_code, long_url, normalized_url):
+        """Add a URL to the table and index without saving (call with self.lock held)."""
         self.urls[short_code] = {
             'long_url': long_url,
             'clicks': 0,
             'created_at': str(hash(long_url))  # Simple timestamp substitute
         }
+        self.url_index[normalized_url] = short_code
+    
+    def shorten_many(self, long_urls, chunk_size=10000):
+        """Shorten many URLs, saving once per chunk.
         
-        self.save_urls()
-        return f"{self.base_url}{short_code}", "Success"
+        Yields (long_url, short_url, message) for every input URL, in order.
+        Invalid URLs get a short_url of None.
+        """
+        long_urls = (url.strip() for url in long_urls)
+        long_urls = (url for url in long_urls if url)
+        while True:
+            chunk = list(itertools.islice(long_urls, chunk_size))
+            if not chunk:
+                break
+            
+            results = []
+            new_codes = []
+            for long_url in chunk:
+                if not self.validate_url(long_url):
+                    results.append((long_url, None, "Invalid URL format"))
+                    continue
+                
+                # The index also covers URLs added earlier in this batch
+                normalized_url = self.normalize_url(long_url)
+                with self.lock:
+                    short_code = self.url_index.get(normalized_url)
+                    if short_code is not None:
+                        results.append((long_url, f"{self.base_url}{short_code}", "URL already exists"))
+                        continue
+                    
+                    short_code = self.new_short_code()
+                    self.store_url(short_code, long_url, normalized_url)
+                new_codes.append(short_code)
+                results.append((long_url, f"{self.base_url}{short_code}", "Success"))
+            
+            if new_codes:
+                self.save_urls(new_codes)
+            yield from results
+    
+    def expand_many(self, short_urls, chunk_size=10000):
+        """Resolve many short URLs without counting clicks.
+        
+        Yields (short_url, long_url) for every input, with None for unknown codes.
+        """
+        short_urls = (url.strip() for url in short_urls)
+        short_urls = (url for url in short_urls if url)
+        while True:
+            chunk = list(itertools.islice(short_urls, chunk_size))
+            if not chunk:
+                break
+            
+            with self.lock:
+                records = [self.get_record(self.extract_code(url)) for url in chunk]
+            for short_url, data in zip(chunk, records):
+                yield short_url, data['long_url'] if data is not None else None
     
     def expand_url(self, short_url):
         """Expand a shortened URL."""
-        # Extract code from URL
-        if short_url.startswith(self.base_url):
-            code = short_url[len(self.base_url):]
-        else:
-            code = short_url
+        code = self.extract_code(short_url)
         
-        if code in self.urls:
-            # Increment click count
-            self.urls[code]['clicks'] += 1
-            self.save_urls()
-            return self.urls[code]['long_url']
+        with self.lock:
+            data = self.get_record(code)
+            if data is None:
+                return None
+            
+            # Count the click in memory; flush_clicks persists it later
+            data['clicks'] += 1
+            bucket = str(int(time.time() // self.bucket_seconds * self.bucket_seconds))
+            history = data.setdefault('click_history', {})
+            history[bucket] = history.get(bucket, 0) + 1
+            self.pending_clicks[code] += 1
+            self.pending_total += 1
+            if self.cache is None or self.cache.peek(code) is not data:
+                # Shelves and compact tables hand out copies, so store the update
+                self.urls[code] = data
+            elif not isinstance(self.urls, dict):
+                # The cached copy is the live one; store it when it is evicted
+                self.dirty_codes.add(code)
+            flush_due = self.pending_total >= self.flush_threshold
         
-        return None
+        if flush_due:
+            if self.flush_thread is not None:
+                self.flush_wakeup.set()
+            else:
+                self.flush_clicks()
+        return data['long_url']
     
     def get_stats(self, short_url):
         """Get statistics for a shortened URL."""
-        if short_url.startswith(self.base_url):
-            code = short_url[len(self.base_url):]
-        else:
-            code = short_url
+        code = self.extract_code(short_url)
         
-        if code in self.urls:
-            return self.urls[code]
-        return None
+        with self.lock:
+            return self.get_record(code)
+    
+    def get_click_histogram(self, short_url):
+        """Get (bucket start, clicks) pairs for a shortened URL, oldest first."""
+        stats = self.get_stats(short_url)
+        if stats is None:
+            return None
+        
+        history = stats.get('click_history', {})
+        return [(datetime.fromtimestamp(int(bucket)), clicks)
+                for bucket, clicks in sorted(history.items(), key=lambda item: int(item[0]))]
     
     def list_urls(self):
         """List all shortened URLs."""
@@ -115,8 +874,299 @@ class URLShortener:
             print(f"Clicks: {data['clicks']}")
             print("-" * 50)
 
+class RedirectServer:
+    """Minimal asyncio HTTP/1.1 front-end for a URLShortener."""
+    reasons = {200: "OK", 201: "Created", 301: "Moved Permanently", 302: "Found",
+               400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+    
+    def __init__(self, shortener, host="127.0.0.1", port=8080, redirect_status=302):
+        self.shortener = shortener
+        self.host = host
+        self.port = port
+        # 301s get cached by browsers, which hides repeat clicks from the stats
+        self.redirect_status = redirect_status
+        self.server = None
+    
+    async def start(self):
+        """Start listening for connections."""
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port,
+                                                 backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+    
+    async def serve_forever(self):
+        """Start the server and serve until cancelled."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+    
+    async def handle_client(self, reader, writer):
+        """Serve requests on one keep-alive connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(self.build_response(400, {'error': 'Malformed request'}, keep_alive=False))
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                
+                body = b""
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(self.build_response(400, {'error': 'Invalid Content-Length'}, keep_alive=False))
+                    break
+                if length:
+                    body = await reader.readexactly(length)
+                
+                connection = headers.get('connection', '').lower()
+                if version == "HTTP/1.0":
+                    keep_alive = connection == 'keep-alive'
+                else:
+                    keep_alive = connection != 'close'
+                
+                status, payload, extra_headers = await self.route(method, path, body)
+                writer.write(self.build_response(status, payload, extra_headers, keep_alive))
+                await writer.drain()
+                
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def route(self, method, path, body):
+        """Dispatch a request and return (status, payload, extra headers)."""
+        path = path.split("?", 1)[0]
+        if method == "POST" and path == "/shorten":
+            try:
+                data = json.loads(body or b"{}")
+                long_url = data['url']
+            except (json.JSONDecodeError, KeyError, TypeError):
+                return 400, {'error': 'Expected JSON body with a "url" field'}, None
+            
+            # Shortening writes (and may compact) the log, so keep it off the event loop
+            loop = asyncio.get_running_loop()
+            short_url, message = await loop.run_in_executor(
+                None, self.shortener.shorten_url, long_url, data.get('custom_code'))
+            if short_url is None:
+                return 400, {'error': message}, None
+            return 201, {'short_url': short_url, 'message': message}, None
+        
+        if method != "GET":
+            return 405, {'error': 'Method not allowed'}, None
+        
+        if path.startswith("/stats/"):
+            stats = self.shortener.get_stats(path[len("/stats/"):])
+            if stats is None:
+                return 404, {'error': 'Short URL not found'}, None
+            return 200, stats, None
+        
+        long_url = self.shortener.expand_url(path.lstrip("/"))
+        if long_url is None:
+            return 404, {'error': 'Short URL not found'}, None
+        return self.redirect_status, None, {'Location': long_url}
+    
+    def build_response(self, status, payload=None, extra_headers=None, keep_alive=True):
+        """Encode an HTTP response."""
+        body = json.dumps(payload).encode() if payload is not None else b""
+        lines = [f"HTTP/1.1 {status} {self.reasons.get(status, '')}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if payload is not None:
+            lines.append("Content-Type: application/json")
+        for name, value in (extra_headers or {}).items():
+            lines.append(f"{name}: {value}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body
+
+def zipf_trace(num_keys, length, exponent=1.1):
+    """Generate a Zipf-distributed list of key ranks."""
+    weights = [1 / (rank ** exponent) for rank in range(1, num_keys + 1)]
+    return random.choices(range(num_keys), weights=weights, k=length)
+
+def cache_benchmark(num_keys=100000, length=500000, exponent=1.1,
+                    capacities=(100, 1000, 10000, 50000)):
+    """Replay a Zipf trace through each cache policy and print memory vs hit rate."""
+    trace = zipf_trace(num_keys, length, exponent)
+    record = {'long_url': "https://example.com/some/fairly/typical/path?id=123456",
+              'clicks': 0, 'created_at': "0"}
+    entry_bytes = sys.getsizeof(record) + sum(sys.getsizeof(v) for v in record.values())
+    
+    print(f"\n=== Cache benchmark: {num_keys:,} codes, {length:,} lookups, Zipf s={exponent} ===")
+    print(f"{'policy':<14}{'capacity':>10}{'~memory':>12}{'hit rate':>10}")
+    for capacity in capacities:
+        for name, policy in CACHE_POLICIES.items():
+            cache = policy(capacity)
+            for key in trace:
+                if cache.get(key) is None:
+                    cache.put(key, record)
+            memory_kb = capacity * entry_bytes / 1024
+            print(f"{name:<14}{capacity:>10,}{memory_kb:>10,.0f}KB{cache.stats()['hit_rate']:>10.1%}")
+
+def memory_benchmark(num_urls=200000):
+    """Compare bytes per entry of the dict-of-dicts and compact URL tables."""
+    hosts = [f"https://www.site{i}.com" for i in range(num_urls // 100 + 1)]
+    
+    now = int(time.time() // 3600 * 3600)
+    
+    def entries(clicked=False):
+        rng = random.Random(0)
+        for i in range(num_urls):
+            data = {'long_url': f"{rng.choice(hosts)}/articles/{i}?ref=feed",
+                    'clicks': rng.randrange(1000),
+                    'created_at': str(hash(i * 7919))}
+            if clicked:
+                # Two hourly buckets from the last week, as left by expand_url
+                bucket = now - rng.randrange(168) * 3600
+                data['click_history'] = {str(bucket): rng.randrange(1, 500),
+                                         str(bucket + 3600): rng.randrange(1, 500)}
+            yield f"c{i:07d}", data
+    
+    def measure(build):
+        tracemalloc.start()
+        table = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size
+    
+    print(f"\n=== Memory benchmark: {num_urls:,} URLs ===")
+    print(f"{'rows':<22}{'dict of dicts':>15}{'CompactURLTable':>17}")
+    for label, clicked in (("never clicked", False), ("2-bucket click history", True)):
+        dict_bytes = measure(lambda: dict(entries(clicked)))
+        compact_bytes = measure(lambda: CompactURLTable(entries(clicked)))
+        print(f"{label:<22}{dict_bytes / num_urls:>9,.0f} B/row{compact_bytes / num_urls:>11,.0f} B/row")
+
+def shorten_benchmark(num_urls=1000000, report_every=100000):
+    """Shorten num_urls new URLs into a log store and print the cost per URL as it grows."""
+    with tempfile.TemporaryDirectory() as directory:
+        base = os.path.join(directory, "urls")
+        shortener = URLShortener(storage=LogStorage(base), code_generator=CodeGenerator(f"{base}.counter"),
+                                 flush_interval=0, compact=True)
+        print(f"\n=== Shorten benchmark: {num_urls:,} URLs, timed per {report_every:,} ===")
+        print(f"{'stored':>12}{'µs/URL':>10}")
+        try:
+            for start in range(0, num_urls, report_every):
+                end = min(num_urls, start + report_every)
+                urls = (f"https://www.site{i % 1000}.com/articles/{i}?ref=feed" for i in range(start, end))
+                began = time.perf_counter()
+                for _ in shortener.shorten_many(urls):
+                    pass
+                elapsed = time.perf_counter() - began
+                # Batches that include a snapshot compaction run a little slower
+                print(f"{end:>12,}{elapsed / (end - start) * 1e6:>10.1f}")
+        finally:
+            shortener.close()
+
+async def load_test(host, port, path, connections=100, requests_per_connection=100):
+    """Hit a running server over keep-alive connections and report latency."""
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    latencies = []
+    errors = 0
+    
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(requests_per_connection):
+                start = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                
+                status_line = await reader.readline()
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                
+                latencies.append(time.perf_counter() - start)
+                if not status_line.split()[1].startswith((b"2", b"3")):
+                    errors += 1
+        finally:
+            writer.close()
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0,
+        'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0
+    }
+
+async def run_local_load_test(shortener, path, connections=100, requests_per_connection=100):
+    """Start a RedirectServer on a free port and load-test it."""
+    server = RedirectServer(shortener, port=0)
+    await server.start()
+    try:
+        return await load_test(server.host, server.port, path, connections, requests_per_connection)
+    finally:
+        server.server.close()
+        await server.server.wait_closed()
+
+def run_bulk(command, source):
+    """Stream URLs from a file (or '-' for stdin) through shorten_many/expand_many."""
+    shortener = URLShortener(storage=LogStorage("urls"), code_generator=CodeGenerator("urls.counter"),
+                             compact=True)
+    input_file = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8')
+    
+    processed = 0
+    failed = 0
+    start = time.perf_counter()
+    try:
+        if command == "shorten":
+            for long_url, short_url, message in shortener.shorten_many(input_file):
+                print(f"{long_url}\t{short_url or ''}\t{message}")
+                processed += 1
+                failed += short_url is None
+        else:
+            for short_url, long_url in shortener.expand_many(input_file):
+                print(f"{short_url}\t{long_url or ''}")
+                processed += 1
+                failed += long_url is None
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        shortener.close()
+    
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed else 0
+    print(f"⚡ {processed:,} URLs in {elapsed:.2f}s ({rate:,.0f}/s), {failed:,} failed",
+          file=sys.stderr)
+
 def main():
-    shortener = URLShortener()
+    shortener = URLShortener(storage=LogStorage("urls"), code_generator=CodeGenerator("urls.counter"),
+                             compact=True)
+    
+    # Migrate the classic urls.json store on first run of the log store
+    if not shortener.urls and os.path.exists("urls.json"):
+        count = shortener.import_json("urls.json")
+        print(f"📥 Imported {count} URLs from urls.json")
     
     print("🔗 URL Shortener")
     print("================")
@@ -127,9 +1177,13 @@ def main():
         print("2. Expand URL")
         print("3. Get URL stats")
         print("4. List all URLs")
-        print("5. Exit")
+        print("5. Import URLs from JSON")
+        print("6. Export URLs to JSON")
+        print("7. Start redirect server")
+        print("8. Run load test")
+        print("9. Exit")
         
-        choice = input("\nChoose an option (1-5): ").strip()
+        choice = input("\nChoose an option (1-9): ").strip()
         
         if choice == "1":
             long_url = input("Enter URL to shorten: ").strip()
@@ -161,6 +1215,12 @@ def main():
                 print(f"\n📊 Statistics:")
                 print(f"Original URL: {stats['long_url']}")
                 print(f"Total clicks: {stats['clicks']}")
+                if shortener.cache is not None:
+                    cache_stats = shortener.cache.stats()
+                    print(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                          f"{cache_stats['evictions']} evictions")
+                for bucket_start, clicks in shortener.get_click_histogram(short_url):
+                    print(f"  {bucket_start:%Y-%m-%d %H:%M}: {clicks}")
             else:
                 print("❌ Short URL not found")
         
@@ -168,6 +1228,52 @@ def main():
             shortener.list_urls()
         
         elif choice == "5":
+            filename = input("Enter JSON file to import: ").strip()
+            try:
+                count = shortener.import_json(filename)
+                print(f"✅ Imported {count} URLs")
+            except FileNotFoundError:
+                print(f"❌ File '{filename}' not found.")
+            except (json.JSONDecodeError, KeyError, AttributeError):
+                print(f"❌ '{filename}' is not a valid URL export.")
+        
+        elif choice == "6":
+            filename = input("Enter JSON file to export to (default urls_export.json): ").strip() or "urls_export.json"
+            count = shortener.export_json(filename)
+            print(f"✅ Exported {count} URLs to {filename}")
+        
+        elif choice == "7":
+            try:
+                port = int(input("Port (default 8080): ").strip() or "8080")
+            except ValueError:
+                print("❌ Invalid port.")
+                continue
+            server = RedirectServer(shortener, port=port)
+            print(f"🌐 Serving on http://{server.host}:{port}/ (Ctrl+C to stop)")
+            try:
+                asyncio.run(server.serve_forever())
+            except KeyboardInterrupt:
+                print("\n🛑 Server stopped")
+        
+        elif choice == "8":
+            short_url = input("Short URL to request: ").strip()
+            try:
+                connections = int(input("Concurrent connections (default 100): ").strip() or "100")
+                requests_each = int(input("Requests per connection (default 100): ").strip() or "100")
+            except ValueError:
+                print("❌ Invalid number.")
+                continue
+            
+            path = "/" + shortener.extract_code(short_url)
+            results = asyncio.run(run_local_load_test(shortener, path, connections, requests_each))
+            print(f"\n⚡ {results['requests']:,} requests in {results['seconds']:.2f}s "
+                  f"({results['errors']} errors)")
+            print(f"Requests/second: {results['requests_per_second']:,.0f}")
+            print(f"p50 latency: {results['p50_ms']:.2f} ms")
+            print(f"p99 latency: {results['p99_ms']:.2f} ms")
+        
+        elif choice == "9":
+            shortener.close()
             print("👋 Goodbye!")
             break
         
@@ -175,4 +1281,20 @@ def main():
             print("❌ Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main()
+    args = sys.argv[1:]
+    if args == ["cache-benchmark"]:
+        cache_benchmark()
+    elif args == ["memory-benchmark"]:
+        memory_benchmark()
+    elif args == ["shorten-benchmark"]:
+        shorten_benchmark()
+    elif len(args) == 2 and args[0] in ("shorten", "expand"):
+        run_bulk(args[0], args[1])
+    elif args:
+        print("Usage: url_shortener.py [cache-benchmark | memory-benchmark | shorten-benchmark |"
+              " shorten FILE | expand FILE]"
+              "  (FILE may be '-')",
+              file=sys.stderr)
+        sys.exit(2)
+    else:
+        main()